@@ -1,21 +1,16 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-import plotly.express as px
 import base64
 import io
 import re
+import sys
 from collections import Counter
+from functools import lru_cache
 import os
-
-try:
-    from textblob import TextBlob
-    HAS_TEXTBLOB = True
-except ImportError:
-    HAS_TEXTBLOB = False
-    print("⚠️ TextBlob not available - using basic NLP")
+import hashlib
+import tempfile
+from cachetools import LRUCache
 
 try:
     import nltk
@@ -24,7 +19,110 @@ except ImportError:
     HAS_NLTK = False
     print("⚠️ NLTK not available - using basic processing")
 
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+    print("⚠️ pyahocorasick not available - using basic keyword matching")
+
+_BASIC_STOP_WORDS = frozenset(['the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'])
+
+_NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'stopwords': 'corpora/stopwords',
+    'wordnet': 'corpora/wordnet'
+}
+
+@lru_cache(maxsize=None)
+def _load_nltk_components():
+    """Fetch missing NLTK data and build shared components once per process"""
+    for package, resource in _NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(package, quiet=True)
+    
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+    
+    return frozenset(stopwords.words('english')), WordNetLemmatizer()
+
+# Month-first before day-first for ambiguous dates, matching pandas' default
+_DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%m/%d/%Y', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%d.%m.%Y')
+
+def _guess_date_fmt(value):
+    """Return the first known strptime format that parses value, or None"""
+    value = str(value).strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            datetime.strptime(value, fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+def _is_named_column(col):
+    """True for real headers; blank and pandas 'Unnamed: N' columns are junk"""
+    return isinstance(col, str) and bool(col.strip()) and not col.startswith('Unnamed')
+
+# Parsed workbooks cached as parquet, one file per workbook path
+_PARQUET_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'zanvar-parquet-cache')
+
+@lru_cache(maxsize=None)
+def _pyplot():
+    """Import pyplot on the first chart request so text-only callers skip it"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def _figure_to_base64(fig):
+    """Render a Matplotlib figure to a base64 PNG string and release it"""
+    with io.BytesIO() as buf:
+        try:
+            fig.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+        finally:
+            _pyplot().close(fig)
+        # Encode straight from the buffer's memory instead of a getvalue() copy
+        with buf.getbuffer() as view:
+            return base64.b64encode(view).decode('ascii')
+
 class EnhancedSmartAnalyzer:
+    # Record-level columns; everything else with a real header is a defect type
+    BASIC_COLUMNS = frozenset(['Unnamed: 0', 'Date', 'Inspected Qty.', 'Part Name', 'Total Rej Qty.'])
+    
+    # Process categories for the insights section: (label, name keywords, advice)
+    DEFECT_CATEGORIES = (
+        ('Sizing Issues', ('size', 'oversize', 'undersize', 'u/s', 'o/s'), 'Check tooling calibration'),
+        ('Surface Defects', ('damage', 'mark', 'toolmark', 'burr', 'scratch'), 'Review cutting parameters'),
+        ('Machining Issues', ('drilling', 'milling', 'boring', 'face', 'cut'), 'Check machine condition'),
+        ('Positioning Errors', ('position', 'off', 'pcd', 'symmetry'), 'Verify setup accuracy'),
+    )
+    
+    # Severity indicators by share of all rejections: <=2%, <=5%, <=10%, above
+    _SEVERITY_THRESHOLDS = np.array([2, 5, 10])
+    _SEVERITY_EMOJI = np.array(['🟢', '🟡', '🟠', '🔴'])
+    
+    # "top 5", "first 3", "10 most", "5 highest"
+    _COUNT_RE = re.compile(r'(?:top|first)\s*(?P<n>\d+)|(?P<m>\d+)\s*(?:most|highest)')
+    
+    # answer_question routing, compiled once instead of per question
+    _CHART_RE = re.compile(r'chart|graph|plot|draw|show|visualize|pie|bar|line')
+    # Handlers only hand off to charts for explicit chart/graph wording
+    _HANDLER_CHART_RE = re.compile(r'chart|graph')
+    # Every phrasing of "which rejection reasons?" in one alternation;
+    # n1/n2 capture the count when it sits next to top/highest/most
+    _REJECTION_RE = re.compile('|'.join((
+        r'top\s*(?P<n1>\d+)?\s*(?:rejection|defect|cause)',
+        r'(?:tell|show|list|give)\s*(?:me\s*)?(?:top|highest|most)\s*(?P<n2>\d+)?\s*(?:rejection|defect|reason)',
+        r'most\s*(?:frequent|common)\s*(?:rejection|defect)',
+        r'highest\s*(?:rejection|defect)',
+        r'(?:rejection|defect)\s*reason',
+        r'(?:why|what)\s*.*(?:reject|fail)',
+    )))
+    _NUMBER_RE = re.compile(r'\d+')
+    
     def __init__(self, file_path):
         """Initialize the enhanced analyzer with better NLP capabilities"""
         self.file_path = file_path
@@ -39,6 +137,12 @@ class EnhancedSmartAnalyzer:
             'chart_preferences': {}
         }
         
+        # Semantic analysis is deterministic per question, so repeats are cached
+        self.analysis_cache = LRUCache(maxsize=1024)
+        
+        # Top-N reason reports only depend on the loaded data and N
+        self.top_reasons_cache = LRUCache(maxsize=32)
+        
         # Initialize NLP components
         self.initialize_nlp()
         
@@ -52,31 +156,21 @@ class EnhancedSmartAnalyzer:
         """Initialize NLP components for better text understanding"""
         try:
             if HAS_NLTK:
-                # Download required NLTK data if not present
-                import nltk
+                # Download required NLTK data only if missing, once per process
                 try:
-                    nltk.download('punkt', quiet=True)
-                    nltk.download('stopwords', quiet=True)
-                    nltk.download('wordnet', quiet=True)
-                    
-                    from nltk.corpus import stopwords
-                    from nltk.tokenize import word_tokenize
-                    from nltk.stem import WordNetLemmatizer
-                    
-                    self.stop_words = set(stopwords.words('english'))
-                    self.lemmatizer = WordNetLemmatizer()
+                    self.stop_words, self.lemmatizer = _load_nltk_components()
                     print("✅ NLTK components initialized")
                 except:
-                    self.stop_words = set(['the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'])
+                    self.stop_words = _BASIC_STOP_WORDS
                     self.lemmatizer = None
             else:
-                self.stop_words = set(['the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'])
+                self.stop_words = _BASIC_STOP_WORDS
                 self.lemmatizer = None
                 
         except Exception as e:
             print(f"⚠️ NLP initialization warning: {e}")
             # Fallback to basic processing
-            self.stop_words = set(['the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'])
+            self.stop_words = _BASIC_STOP_WORDS
             self.lemmatizer = None
     
     def setup_semantic_patterns(self):
@@ -126,25 +220,146 @@ class EnhancedSmartAnalyzer:
                 'entities': ['rate', 'ratio', 'percentage']
             }
         }
+        
+        # Contextual words that strongly suggest a chart type
+        self.chart_boost_keywords = {
+            'pie': ['distribution', 'proportion', 'breakdown', 'share'],
+            'bar': ['compare', 'top', 'highest', 'lowest', 'rank'],
+            'line': ['trend', 'over time', 'monthly', 'progression']
+        }
+        
+        # Checked in order; the first type with a matching keyword wins
+        self.question_type_patterns = {
+            'comparison': ['compare', 'versus', 'vs', 'difference', 'better', 'worse'],
+            'ranking': ['top', 'highest', 'lowest', 'best', 'worst', 'rank'],
+            'quantity': ['how many', 'count', 'number', 'total', 'sum'],
+            'analysis': ['analyze', 'analysis', 'insight', 'pattern', 'trend'],
+            'visualization': ['chart', 'graph', 'plot', 'draw', 'show', 'visualize'],
+            'specific': ['which', 'what', 'when', 'where', 'who'],
+            'temporal': ['when', 'date', 'time', 'month', 'day', 'year']
+        }
+        
+        self.build_keyword_matcher()
+    
+    def build_keyword_matcher(self):
+        """Index every keyword/phrase so a question is scanned only once"""
+        # keyword -> [(kind, label, weight), ...]; keys are lowercased and
+        # interned once so hit lookups hash static strings only at setup
+        self.keyword_index = {}
+        
+        def add(words, kind, label, weight):
+            for word in words:
+                word = sys.intern(word.lower())
+                self.keyword_index.setdefault(word, []).append((kind, label, weight))
+        
+        for chart_type, patterns in self.chart_type_patterns.items():
+            add(patterns['keywords'], 'chart', chart_type, 2)
+            add(patterns['phrases'], 'chart', chart_type, 3)
+        for chart_type, words in self.chart_boost_keywords.items():
+            add(words, 'chart_boost', chart_type, 5)
+        for focus_type, patterns in self.data_focus_patterns.items():
+            add(patterns['keywords'], 'focus', focus_type, 2)
+            add(patterns['phrases'], 'focus', focus_type, 3)
+        for q_type, words in self.question_type_patterns.items():
+            add(words, 'question', q_type, 0)
+        
+        # Words that always mean "draw something", whatever the question type
+        self.visualization_keywords = frozenset(sys.intern(word.lower()) for word in self.question_type_patterns['visualization'])
+        
+        self.keyword_automaton = None
+        if HAS_AHOCORASICK:
+            automaton = ahocorasick.Automaton()
+            for word in self.keyword_index:
+                automaton.add_word(word, word)
+            automaton.make_automaton()
+            self.keyword_automaton = automaton
+    
+    def scan_keywords(self, question_lower):
+        """Return the set of indexed keywords/phrases found in the question"""
+        if self.keyword_automaton is not None:
+            return {word for _, word in self.keyword_automaton.iter(question_lower)}
+        return {word for word in self.keyword_index if word in question_lower}
     
     def load_and_analyze_data(self):
         """Load and perform initial analysis of the data"""
         try:
-            # Load the file
+            # Load the file, skipping unnamed/blank columns at parse time
             if self.file_path.endswith('.xlsx'):
-                self.df = pd.read_excel(self.file_path)
+                self.df = self.read_excel_cached()
             elif self.file_path.endswith('.csv'):
-                self.df = pd.read_csv(self.file_path)
+                header = pd.read_csv(self.file_path, nrows=0).columns
+                self.df = pd.read_csv(self.file_path, usecols=[col for col in header if _is_named_column(col)])
             else:
                 raise ValueError("Unsupported file format")
             
-            # Convert date column
-            if 'Date' in self.df.columns:
-                self.df['Date'] = pd.to_datetime(self.df['Date'])
+            # Convert date column (Excel dates already arrive as datetimes)
+            if 'Date' in self.df.columns and not pd.api.types.is_datetime64_any_dtype(self.df['Date']):
+                dates = self.df['Date'].dropna()
+                fmt = _guess_date_fmt(dates.iloc[0]) if len(dates) else None
+                try:
+                    self.df['Date'] = pd.to_datetime(self.df['Date'], format=fmt, cache=True)
+                except ValueError:
+                    # Mixed formats: fall back to per-value inference
+                    self.df['Date'] = pd.to_datetime(self.df['Date'], cache=True)
             
             # Identify key columns
             self.identify_columns()
             
+            # Record-level quantities are small counts: store them in the
+            # narrowest integer type, or float32 when cells are blank
+            for col in ('Inspected Qty.', 'Total Rej Qty.'):
+                if col in self.df.columns:
+                    quantities = pd.to_numeric(self.df[col], errors='coerce')
+                    self.df[col] = pd.to_numeric(quantities, downcast='integer' if quantities.notna().all() else 'float')
+            
+            # Store repetitive text columns as categoricals (integer codes over
+            # one shared label table); Part Name always qualifies
+            for col in self.df.select_dtypes(include='object').columns:
+                if col == 'Part Name' or self.df[col].nunique() < 0.1 * len(self.df):
+                    self.df[col] = self.df[col].astype('category')
+            
+            # Defect counts as one float32 block, one contiguous column per
+            # defect type (blank cells mean no defects of that type)
+            defect_frame = self.df[self.defect_columns].apply(pd.to_numeric, errors='coerce').fillna(0).astype(np.float32)
+            self.df[self.defect_columns] = defect_frame
+            self._defect_matrix = np.asfortranarray(defect_frame.to_numpy())
+            self._defect_names = np.array(self.defect_columns, dtype=object)
+            
+            # Defect totals never change after load, so compute them once
+            self._defect_totals = self._defect_matrix.sum(axis=0, dtype=np.float64)
+            active = self._defect_totals > 0
+            self._active_defect_count = int(active.sum())
+            self._total_rejections = self._defect_totals[active].sum()
+            
+            # Tag each defect column with its process categories once;
+            # a name can fall into several (e.g. "MILLING FACE TOOL MARK")
+            names_lower = [name.lower() for name in self.defect_columns]
+            self._defect_category_mask = np.array(
+                [[any(word in name for word in words) for name in names_lower]
+                 for _, words, _ in self.DEFECT_CATEGORIES],
+                dtype=bool
+            ).reshape(len(self.DEFECT_CATEGORIES), len(names_lower))
+            
+            # Monthly rejection/inspection totals for the trend chart: bin rows
+            # by month index and sum each quantity in one bincount pass
+            months = self.df['Date'].to_numpy().astype('datetime64[M]')
+            valid = ~np.isnat(months)
+            month_codes = months[valid].astype(np.int64)
+            base = month_codes.min() if month_codes.size else 0
+            month_idx = month_codes - base
+            rej = np.bincount(month_idx, self.df['Total Rej Qty.'].to_numpy(np.float64, na_value=0)[valid])
+            insp = np.bincount(month_idx, self.df['Inspected Qty.'].to_numpy(np.float64, na_value=0)[valid])
+            present = np.bincount(month_idx) > 0
+            self._monthly_data = pd.DataFrame({
+                'Date': (np.flatnonzero(present) + base).astype('datetime64[M]').astype('datetime64[ns]'),
+                'Total Rej Qty.': rej[present],
+                'Inspected Qty.': insp[present],
+                'Rejection_Rate': rej[present] / np.maximum(insp[present], 1) * 100
+            })
+            
+            # Per-part rejection totals for parts questions
+            self._part_totals = self.df.groupby('Part Name', observed=True)['Total Rej Qty.'].sum()
+            
             # Generate metadata
             self.generate_metadata()
             
@@ -158,14 +373,32 @@ class EnhancedSmartAnalyzer:
         except Exception as e:
             print(f"❌ Error loading data: {e}")
     
+    def read_excel_cached(self):
+        """Read the Excel file through a parquet cache that is rebuilt whenever the workbook is newer"""
+        # Kept out of the workbook's folder, since app.py lists uploads/ as the user's files
+        key = hashlib.sha1(os.path.abspath(self.file_path).encode('utf-8')).hexdigest()
+        cache_path = os.path.join(_PARQUET_CACHE_DIR, key + '.parquet')
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(self.file_path):
+            try:
+                return pd.read_parquet(cache_path)
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable parquet cache: {e}")
+        
+        df = pd.read_excel(self.file_path, usecols=_is_named_column)
+        try:
+            os.makedirs(_PARQUET_CACHE_DIR, exist_ok=True)
+            df.to_parquet(cache_path)
+        except Exception as e:
+            # Missing pyarrow, mixed-type columns or a read-only folder
+            print(f"⚠️ Could not write parquet cache: {e}")
+        return df
+    
     def identify_columns(self):
         """Identify and categorize different types of columns"""
-        # Identify defect columns (all columns except basic info)
-        basic_cols = ['Unnamed: 0', 'Date', 'Inspected Qty.', 'Part Name', 'Total Rej Qty.']
-        self.defect_columns = [col for col in self.df.columns if col not in basic_cols and not col.startswith('Unnamed')]
-        
-        # Clean up defect columns (remove empty or unnamed columns)
-        self.defect_columns = [col for col in self.defect_columns if not pd.isna(col) and col.strip()]
+        # Identify defect columns (all columns except basic info), skipping
+        # empty or unnamed headers. Built straight from self.df.columns, so
+        # downstream code can index with it without membership checks.
+        self.defect_columns = [col for col in self.df.columns if col not in self.BASIC_COLUMNS and _is_named_column(col)]
     
     def generate_metadata(self):
         """Generate comprehensive metadata about the dataset"""
@@ -179,105 +412,105 @@ class EnhancedSmartAnalyzer:
             'part_names': self.df['Part Name'].unique().tolist(),
             'total_rejections': self.df['Total Rej Qty.'].sum(),
             'defect_types': self.defect_columns,
-            'months_available': sorted(self.df['Date'].dt.to_period('M').unique().astype(str)),
+            # Month keys come from the load-time monthly bins, already sorted
+            'months_available': self._monthly_data['Date'].dt.strftime('%Y-%m').tolist(),
         }
     
+    def get_top_defect_indices(self, count):
+        """Return defect column indices of the top N defects that occurred"""
+        totals = self._defect_totals
+        # count=None (no number in the question) ranks every defect
+        if count is not None and 0 < count < len(totals):
+            # Partial selection of the top N, then sort only those N
+            # (ties keep column order)
+            order = np.argpartition(-totals, count - 1)[:count]
+            order = order[np.lexsort((order, -totals[order]))]
+        else:
+            order = np.argsort(-totals, kind='stable')[:count]
+        return order[totals[order] > 0]
+    
+    def get_top_defects(self, count):
+        """Return [(defect_name, total), ...] for the top N defects that occurred"""
+        order = self.get_top_defect_indices(count)
+        return list(zip(self._defect_names[order].tolist(), self._defect_totals[order].tolist()))
+    
     def get_top_rejection_reasons(self, count=5):
         """Get the top N rejection reasons with detailed analysis"""
+        cached = self.top_reasons_cache.get(count)
+        if cached is not None:
+            return cached
+        
         try:
-            # Calculate totals for all defect columns
-            defect_totals = {}
-            for col in self.defect_columns:
-                if col in self.df.columns:
-                    total = self.df[col].sum()
-                    if total > 0:  # Only include defects that actually occurred
-                        defect_totals[col] = total
-            
-            if not defect_totals:
+            if not self._active_defect_count:
                 return "❌ **Answer:** No defect data found in the dataset."
             
-            # Sort by total count and get top N
-            sorted_defects = sorted(defect_totals.items(), key=lambda x: x[1], reverse=True)[:count]
+            # Get top N by total count
+            top_idx = self.get_top_defect_indices(count)
+            top_counts = self._defect_totals[top_idx]
+            sorted_defects = list(zip(self._defect_names[top_idx].tolist(), top_counts.tolist()))
             
             if not sorted_defects:
                 return "❌ **Answer:** No rejection data available."
             
-            # Calculate total rejections for percentage calculation
-            total_rejections = sum(defect_totals.values())
+            # Total rejections for percentage calculation
+            total_rejections = self._total_rejections
             
             # Format the enhanced response
-            answer = f"🎯 **Top {len(sorted_defects)} Rejection Reasons (Enhanced Analysis):**\n\n"
+            out = []
+            out.append(f"🎯 **Top {len(sorted_defects)} Rejection Reasons (Enhanced Analysis):**\n\n")
             
-            for i, (defect_type, count) in enumerate(sorted_defects, 1):
-                percentage = (count / total_rejections) * 100
-                
-                # Add visual indicators for severity
-                severity = "🔴" if percentage > 10 else "🟠" if percentage > 5 else "🟡" if percentage > 2 else "🟢"
-                
-                answer += f"{i}. {severity} **{defect_type}**: {count:,} parts ({percentage:.1f}%)\n"
+            # Add visual indicators for severity, looked up for all rows at once
+            percentages = (top_counts / total_rejections) * 100
+            severities = self._SEVERITY_EMOJI[np.searchsorted(self._SEVERITY_THRESHOLDS, percentages)]
+            
+            out.extend(
+                f"{i}. {severity} **{defect_type}**: {count:,} parts ({percentage:.1f}%)\n"
+                for i, (severity, (defect_type, count), percentage) in enumerate(zip(severities, sorted_defects, percentages), 1)
+            )
             
             # Add comprehensive summary statistics
-            answer += f"\n📊 **Detailed Summary:**\n"
-            answer += f"• Total defect categories tracked: {len(self.defect_columns)}\n"
-            answer += f"• Active defect types (with occurrences): {len(defect_totals)}\n"
-            answer += f"• Total rejections across all types: {total_rejections:,} parts\n"
-            answer += f"• Average rejections per defect type: {total_rejections/len(defect_totals):.1f} parts\n"
+            out.append(f"\n📊 **Detailed Summary:**\n")
+            out.append(f"• Total defect categories tracked: {len(self.defect_columns)}\n")
+            out.append(f"• Active defect types (with occurrences): {self._active_defect_count}\n")
+            out.append(f"• Total rejections across all types: {total_rejections:,} parts\n")
+            out.append(f"• Average rejections per defect type: {total_rejections/self._active_defect_count:.1f} parts\n")
             
             # Calculate cumulative impact
-            cumulative_percentages = []
-            cumulative_sum = 0
-            for _, count in sorted_defects:
-                cumulative_sum += count
-                cumulative_percentages.append((cumulative_sum / total_rejections) * 100)
-            
-            answer += f"\n🎯 **Impact Analysis:**\n"
-            answer += f"• Top 1 defect accounts for: {cumulative_percentages[0]:.1f}% of all rejections\n"
+            cumulative_percentages = np.cumsum(top_counts) / total_rejections * 100
+            
+            out.append(f"\n🎯 **Impact Analysis:**\n")
+            out.append(f"• Top 1 defect accounts for: {cumulative_percentages[0]:.1f}% of all rejections\n")
             if len(cumulative_percentages) >= 3:
-                answer += f"• Top 3 defects account for: {cumulative_percentages[2]:.1f}% of all rejections\n"
+                out.append(f"• Top 3 defects account for: {cumulative_percentages[2]:.1f}% of all rejections\n")
             if len(cumulative_percentages) >= 5:
-                answer += f"• Top 5 defects account for: {cumulative_percentages[4]:.1f}% of all rejections\n"
+                out.append(f"• Top 5 defects account for: {cumulative_percentages[4]:.1f}% of all rejections\n")
             
             # Add process insights
-            answer += f"\n💡 **Process Insights:**\n"
-            
-            # Categorize defects by type
-            sizing_defects = [d for d, _ in sorted_defects if any(word in d[0].lower() for word in ['size', 'oversize', 'undersize', 'u/s', 'o/s'])]
-            surface_defects = [d for d, _ in sorted_defects if any(word in d[0].lower() for word in ['damage', 'mark', 'toolmark', 'burr', 'scratch'])]
-            machining_defects = [d for d, _ in sorted_defects if any(word in d[0].lower() for word in ['drilling', 'milling', 'boring', 'face', 'cut'])]
-            position_defects = [d for d, _ in sorted_defects if any(word in d[0].lower() for word in ['position', 'off', 'pcd', 'symmetry'])]
-            
-            if sizing_defects:
-                sizing_count = sum([count for defect, count in sizing_defects])
-                sizing_pct = (sizing_count / total_rejections) * 100
-                answer += f"• Sizing Issues: {len(sizing_defects)} types, {sizing_count:,} parts ({sizing_pct:.1f}%) - Check tooling calibration\n"
-            
-            if surface_defects:
-                surface_count = sum([count for defect, count in surface_defects])
-                surface_pct = (surface_count / total_rejections) * 100
-                answer += f"• Surface Defects: {len(surface_defects)} types, {surface_count:,} parts ({surface_pct:.1f}%) - Review cutting parameters\n"
-            
-            if machining_defects:
-                machining_count = sum([count for defect, count in machining_defects])
-                machining_pct = (machining_count / total_rejections) * 100
-                answer += f"• Machining Issues: {len(machining_defects)} types, {machining_count:,} parts ({machining_pct:.1f}%) - Check machine condition\n"
-            
-            if position_defects:
-                position_count = sum([count for defect, count in position_defects])
-                position_pct = (position_count / total_rejections) * 100
-                answer += f"• Positioning Errors: {len(position_defects)} types, {position_count:,} parts ({position_pct:.1f}%) - Verify setup accuracy\n"
+            out.append(f"\n💡 **Process Insights:**\n")
+            
+            # Categorize the top defects by process type
+            top_mask = self._defect_category_mask[:, top_idx]
+            category_types = top_mask.sum(axis=1)
+            category_counts = top_mask @ top_counts
+            
+            for (label, _, advice), n_types, category_count in zip(self.DEFECT_CATEGORIES, category_types, category_counts):
+                if n_types:
+                    category_pct = (category_count / total_rejections) * 100
+                    out.append(f"• {label}: {n_types} types, {category_count:,} parts ({category_pct:.1f}%) - {advice}\n")
             
             # Add recommendations
-            answer += f"\n🔧 **Action Recommendations:**\n"
+            out.append(f"\n🔧 **Action Recommendations:**\n")
             top_defect = sorted_defects[0]
-            answer += f"• **Priority 1:** Address '{top_defect[0]}' immediately ({top_defect[1]:,} parts, {(top_defect[1]/total_rejections)*100:.1f}%)\n"
+            out.append(f"• **Priority 1:** Address '{top_defect[0]}' immediately ({top_defect[1]:,} parts, {(top_defect[1]/total_rejections)*100:.1f}%)\n")
             
             if len(sorted_defects) >= 2:
-                answer += f"• **Priority 2:** Focus on top 3 defects for 80/20 impact\n"
+                out.append(f"• **Priority 2:** Focus on top 3 defects for 80/20 impact\n")
             
-            answer += f"• **Process Review:** Implement root cause analysis for defects >5% of total\n"
-            answer += f"• **Quality Control:** Enhance inspection for the top {min(3, len(sorted_defects))} defect categories\n"
+            out.append(f"• **Process Review:** Implement root cause analysis for defects >5% of total\n")
+            out.append(f"• **Quality Control:** Enhance inspection for the top {min(3, len(sorted_defects))} defect categories\n")
             
-            return answer
+            response = self.top_reasons_cache[count] = ''.join(out)
+            return response
             
         except Exception as e:
             return f"❌ **Error analyzing rejection reasons:** {str(e)}"
@@ -286,9 +519,16 @@ class EnhancedSmartAnalyzer:
         """Analyze question using enhanced semantic understanding"""
         question_lower = question.lower().strip()
         
-        # Use TextBlob for basic NLP analysis if available
+        cached = self.analysis_cache.get(question_lower)
+        if cached is None:
+            cached = self.analysis_cache[question_lower] = self._analyze_question_lower(question_lower)
+        
+        # Fresh copy per call so callers can't mutate the cached entry
+        return {'original_question': question, **cached, 'specific_entities': list(cached['specific_entities'])}
+    
+    def _analyze_question_lower(self, question_lower):
+        """Semantic analysis of an already lowercased, stripped question"""
         analysis = {
-            'original_question': question,
             'chart_type': 'auto',  # Will be determined
             'data_focus': 'auto',  # Will be determined
             'specific_count': None,
@@ -299,124 +539,103 @@ class EnhancedSmartAnalyzer:
         }
         
         # Extract specific numbers (top 5, top 10, etc.)
-        number_matches = re.findall(r'top\s*(\d+)|first\s*(\d+)|(\d+)\s*most|(\d+)\s*highest', question_lower)
-        if number_matches:
-            for match in number_matches:
-                for num in match:
-                    if num:
-                        analysis['specific_count'] = int(num)
-                        break
-                if analysis['specific_count']:
-                    break
+        count_match = self._COUNT_RE.search(question_lower)
+        if count_match:
+            analysis['specific_count'] = int(count_match.group('n') or count_match.group('m'))
+        
+        # Find all known keywords in a single pass
+        hits = self.scan_keywords(question_lower)
+        analysis['matched_keywords'] = frozenset(hits)
         
         # Determine chart type preference
-        analysis['chart_type'] = self.determine_chart_type(question_lower)
+        analysis['chart_type'] = self.determine_chart_type(question_lower, hits)
         
         # Determine data focus
-        analysis['data_focus'] = self.determine_data_focus(question_lower)
+        analysis['data_focus'] = self.determine_data_focus(question_lower, hits)
         
         # Determine question type
-        analysis['question_type'] = self.determine_question_type(question_lower)
+        analysis['question_type'] = self.determine_question_type(question_lower, hits)
         
         return analysis
     
-    def determine_chart_type(self, question_lower):
+    def determine_chart_type(self, question_lower, hits=None):
         """Intelligently determine the best chart type for the question"""
-        chart_scores = {}
-        
-        for chart_type, patterns in self.chart_type_patterns.items():
-            score = 0
-            
-            # Check keywords
-            for keyword in patterns['keywords']:
-                if keyword in question_lower:
-                    score += 2
-            
-            # Check phrases (higher weight)
-            for phrase in patterns['phrases']:
-                if phrase in question_lower:
-                    score += 3
-            
-            chart_scores[chart_type] = score
-        
-        # Contextual logic for chart selection
-        if any(word in question_lower for word in ['distribution', 'proportion', 'breakdown', 'share']):
-            chart_scores['pie'] += 5
-        
-        if any(word in question_lower for word in ['compare', 'top', 'highest', 'lowest', 'rank']):
-            chart_scores['bar'] += 5
-        
-        if any(word in question_lower for word in ['trend', 'over time', 'monthly', 'progression']):
-            chart_scores['line'] += 5
+        if hits is None:
+            hits = self.scan_keywords(question_lower)
+        
+        # Keywords score 2, phrases score 3 (higher weight)
+        chart_scores = dict.fromkeys(self.chart_type_patterns, 0)
+        boosted = set()
+        
+        for word in hits:
+            for kind, chart_type, weight in self.keyword_index[word]:
+                if kind == 'chart':
+                    chart_scores[chart_type] += weight
+                elif kind == 'chart_boost' and chart_type not in boosted:
+                    # Contextual logic for chart selection, applied once per type
+                    boosted.add(chart_type)
+                    chart_scores[chart_type] += weight
         
         # Return the chart type with highest score, or 'auto' if no clear preference
         best_chart = max(chart_scores, key=chart_scores.get) if max(chart_scores.values()) > 0 else 'auto'
         return best_chart
     
-    def determine_data_focus(self, question_lower):
+    def determine_data_focus(self, question_lower, hits=None):
         """Determine what type of data the user is asking about"""
-        focus_scores = {}
+        if hits is None:
+            hits = self.scan_keywords(question_lower)
         
-        for focus_type, patterns in self.data_focus_patterns.items():
-            score = 0
-            
-            # Check keywords
-            for keyword in patterns['keywords']:
-                if keyword in question_lower:
-                    score += 2
-            
-            # Check phrases
-            for phrase in patterns['phrases']:
-                if phrase in question_lower:
-                    score += 3
-            
-            focus_scores[focus_type] = score
+        focus_scores = dict.fromkeys(self.data_focus_patterns, 0)
+        
+        for word in hits:
+            for kind, focus_type, weight in self.keyword_index[word]:
+                if kind == 'focus':
+                    focus_scores[focus_type] += weight
         
         # Return the focus with highest score
         best_focus = max(focus_scores, key=focus_scores.get) if max(focus_scores.values()) > 0 else 'auto'
         return best_focus
     
-    def determine_question_type(self, question_lower):
+    def determine_question_type(self, question_lower, hits=None):
         """Determine the type of question being asked"""
-        question_types = {
-            'comparison': ['compare', 'versus', 'vs', 'difference', 'better', 'worse'],
-            'ranking': ['top', 'highest', 'lowest', 'best', 'worst', 'rank'],
-            'quantity': ['how many', 'count', 'number', 'total', 'sum'],
-            'analysis': ['analyze', 'analysis', 'insight', 'pattern', 'trend'],
-            'visualization': ['chart', 'graph', 'plot', 'draw', 'show', 'visualize'],
-            'specific': ['which', 'what', 'when', 'where', 'who'],
-            'temporal': ['when', 'date', 'time', 'month', 'day', 'year']
-        }
+        if hits is None:
+            hits = self.scan_keywords(question_lower)
+        
+        matched_types = {q_type for word in hits
+                         for kind, q_type, _ in self.keyword_index[word] if kind == 'question'}
         
-        for q_type, keywords in question_types.items():
-            if any(keyword in question_lower for keyword in keywords):
+        for q_type in self.question_type_patterns:
+            if q_type in matched_types:
                 return q_type
         
         return 'general'
     
-    def generate_intelligent_response(self, question):
+    def generate_intelligent_response(self, question, question_lower=None):
         """Generate an intelligent response with appropriate charts"""
+        if question_lower is None:
+            question_lower = question.lower()
+        
         # Analyze the question semantically
         analysis = self.analyze_question_semantically(question)
         
         # Route to appropriate handler based on analysis
-        if analysis['question_type'] == 'visualization' or any(word in question.lower() for word in ['chart', 'graph', 'plot', 'draw', 'show', 'visualize']):
-            return self.create_smart_visualization(question, analysis)
+        if analysis['question_type'] == 'visualization' or not self.visualization_keywords.isdisjoint(analysis['matched_keywords']):
+            return self.create_smart_visualization(question, question_lower, analysis)
         
         elif analysis['data_focus'] == 'defects':
-            return self.handle_defect_analysis(question, analysis)
+            return self.handle_defect_analysis(question, question_lower, analysis)
         
         elif analysis['data_focus'] == 'parts':
-            return self.handle_parts_analysis(question, analysis)
+            return self.handle_parts_analysis(question, question_lower, analysis)
         
         elif analysis['data_focus'] == 'trends':
-            return self.handle_trend_analysis(question, analysis)
+            return self.handle_trend_analysis(question, question_lower, analysis)
         
         else:
             # Enhanced fallback
             return self.get_top_rejection_reasons(analysis.get('specific_count', 5))
     
-    def create_smart_visualization(self, question, analysis):
+    def create_smart_visualization(self, question, question_lower, analysis):
         """Create smart visualizations based on semantic analysis"""
         try:
             chart_type = analysis['chart_type']
@@ -426,7 +645,7 @@ class EnhancedSmartAnalyzer:
             # Smart chart selection logic
             if chart_type == 'auto':
                 if data_focus == 'defects':
-                    chart_type = 'pie' if 'distribution' in question.lower() else 'bar'
+                    chart_type = 'pie' if 'distribution' in question_lower else 'bar'
                 elif data_focus == 'trends':
                     chart_type = 'line'
                 elif data_focus == 'parts':
@@ -451,61 +670,47 @@ class EnhancedSmartAnalyzer:
         """Create an intelligent pie chart based on context"""
         try:
             # Get defect distribution pie chart
-            defect_totals = {}
-            for col in self.defect_columns:
-                if col in self.df.columns:
-                    total = self.df[col].sum()
-                    if total > 0:
-                        defect_totals[col] = total
-            
-            if not defect_totals:
+            if not self._active_defect_count:
                 return "❌ **No defect data available for pie chart.**"
             
-            # Sort and get top N
-            sorted_defects = sorted(defect_totals.items(), key=lambda x: x[1], reverse=True)[:min(count, 10)]
+            # Get top N
+            sorted_defects = self.get_top_defects(min(count, 10))
             
             defect_names = [item[0] for item in sorted_defects]
             defect_counts = [item[1] for item in sorted_defects]
             
             # Create pie chart
-            fig = px.pie(
-                values=defect_counts,
-                names=defect_names,
-                title=f'Smart Analysis: Top {len(defect_names)} Rejection Reasons Distribution'
-            )
-            
-            fig.update_traces(textposition='inside', textinfo='percent+label')
-            fig.update_layout(
-                showlegend=True,
-                legend=dict(orientation="v", yanchor="top", y=1, xanchor="left", x=1.01),
-                width=1000,
-                height=600
-            )
+            plt = _pyplot()
+            fig, ax = plt.subplots(figsize=(10, 6))
+            wedges, _, _ = ax.pie(defect_counts, autopct='%1.1f%%', startangle=90, counterclock=False)
+            ax.legend(wedges, defect_names, loc='upper left', bbox_to_anchor=(1.01, 1))
+            ax.set_title(f'Smart Analysis: Top {len(defect_names)} Rejection Reasons Distribution')
+            ax.axis('equal')
             
             # Convert to base64
-            img_bytes = fig.to_image(format="png", width=1000, height=600)
-            img_base64 = base64.b64encode(img_bytes).decode()
+            img_base64 = _figure_to_base64(fig)
             
             # Create intelligent response
             total_rejections = sum(defect_counts)
             top_defect_percentage = (defect_counts[0] / total_rejections) * 100
             
-            response = f"📊 **Smart Pie Chart Analysis: Rejection Reasons Distribution**\n\n"
-            response += f"🎯 **Key Insights:**\n"
-            response += f"• **Dominant defect**: {defect_names[0]} ({defect_counts[0]:,} parts, {top_defect_percentage:.1f}%)\n"
-            response += f"• **Data coverage**: {len(defect_names)} defect categories\n"
-            response += f"• **Total rejections**: {total_rejections:,} parts\n\n"
+            out = []
+            out.append(f"📊 **Smart Pie Chart Analysis: Rejection Reasons Distribution**\n\n")
+            out.append(f"🎯 **Key Insights:**\n")
+            out.append(f"• **Dominant defect**: {defect_names[0]} ({defect_counts[0]:,} parts, {top_defect_percentage:.1f}%)\n")
+            out.append(f"• **Data coverage**: {len(defect_names)} defect categories\n")
+            out.append(f"• **Total rejections**: {total_rejections:,} parts\n\n")
             
             # Add actionable insights
             if top_defect_percentage > 50:
-                response += f"💡 **Critical Insight**: {defect_names[0]} accounts for over {top_defect_percentage:.0f}% of rejections - immediate action required!\n\n"
+                out.append(f"💡 **Critical Insight**: {defect_names[0]} accounts for over {top_defect_percentage:.0f}% of rejections - immediate action required!\n\n")
             elif top_defect_percentage > 30:
-                response += f"⚠️ **High Impact**: {defect_names[0]} is the major contributor - prioritize this defect type.\n\n"
+                out.append(f"⚠️ **High Impact**: {defect_names[0]} is the major contributor - prioritize this defect type.\n\n")
             
-            response += f"📈 **Generated Chart:**\n"
-            response += f"data:image/png;base64,{img_base64}"
+            out.append(f"📈 **Generated Chart:**\n")
+            out.append(f"data:image/png;base64,{img_base64}")
             
-            return response
+            return ''.join(out)
             
         except Exception as e:
             return f"❌ **Error creating pie chart:** {str(e)}"
@@ -514,50 +719,34 @@ class EnhancedSmartAnalyzer:
         """Create an intelligent bar chart based on context"""
         try:
             # Create defect ranking bar chart
-            defect_totals = {}
-            for col in self.defect_columns:
-                if col in self.df.columns:
-                    total = self.df[col].sum()
-                    if total > 0:
-                        defect_totals[col] = total
-            
-            sorted_defects = sorted(defect_totals.items(), key=lambda x: x[1], reverse=True)[:count]
+            sorted_defects = self.get_top_defects(count)
             defect_names = [item[0] for item in sorted_defects]
             defect_counts = [item[1] for item in sorted_defects]
             
-            # Create horizontal bar chart for better readability
-            fig = px.bar(
-                x=defect_counts,
-                y=defect_names,
-                orientation='h',
-                title=f'Smart Analysis: Top {len(defect_names)} Rejection Causes (Ranked)',
-                labels={'x': 'Total Rejections', 'y': 'Defect Type'},
-                color=defect_counts,
-                color_continuous_scale='Reds'
-            )
+            # Create horizontal bar chart for better readability, largest on top
+            plt = _pyplot()
+            colors = plt.cm.Reds(plt.Normalize(0, max(defect_counts))(defect_counts))
+            fig, ax = plt.subplots(figsize=(12, max(600, len(defect_names) * 30) / 100))
+            ax.barh(defect_names[::-1], defect_counts[::-1], color=colors[::-1])
+            ax.set_title(f'Smart Analysis: Top {len(defect_names)} Rejection Causes (Ranked)')
+            ax.set_xlabel('Total Rejections')
+            ax.set_ylabel('Defect Type')
             
-            fig.update_layout(
-                height=max(400, len(defect_names) * 30),
-                margin=dict(l=250, r=50, t=80, b=50),
-                yaxis={'categoryorder': 'total ascending'},
-                showlegend=False
-            )
-            
-            img_bytes = fig.to_image(format="png", width=1200, height=max(600, len(defect_names) * 30))
-            img_base64 = base64.b64encode(img_bytes).decode()
+            img_base64 = _figure_to_base64(fig)
             
             # Generate intelligent insights
             total_rejections = sum(defect_counts)
             top_3_percentage = sum(defect_counts[:3]) / total_rejections * 100
             
-            response = f"📊 **Smart Bar Chart Analysis: Rejection Rankings**\n\n"
-            response += f"🥇 **Top Defect**: {defect_names[0]} ({defect_counts[0]:,} parts)\n"
-            response += f"🎯 **Focus Area**: Top 3 defects = {top_3_percentage:.1f}% of all rejections\n"
-            response += f"📈 **Improvement Potential**: Fixing top defect could reduce rejections by {(defect_counts[0]/total_rejections*100):.1f}%\n\n"
-            response += f"📊 **Generated Chart:**\n"
-            response += f"data:image/png;base64,{img_base64}"
+            out = []
+            out.append(f"📊 **Smart Bar Chart Analysis: Rejection Rankings**\n\n")
+            out.append(f"🥇 **Top Defect**: {defect_names[0]} ({defect_counts[0]:,} parts)\n")
+            out.append(f"🎯 **Focus Area**: Top 3 defects = {top_3_percentage:.1f}% of all rejections\n")
+            out.append(f"📈 **Improvement Potential**: Fixing top defect could reduce rejections by {(defect_counts[0]/total_rejections*100):.1f}%\n\n")
+            out.append(f"📊 **Generated Chart:**\n")
+            out.append(f"data:image/png;base64,{img_base64}")
             
-            return response
+            return ''.join(out)
             
         except Exception as e:
             return f"❌ **Error creating bar chart:** {str(e)}"
@@ -565,155 +754,129 @@ class EnhancedSmartAnalyzer:
     def create_intelligent_line_chart(self, question, analysis):
         """Create an intelligent line chart for trend analysis"""
         try:
-            # Create monthly trend analysis
-            monthly_data = self.df.groupby(self.df['Date'].dt.to_period('M')).agg({
-                'Total Rej Qty.': 'sum',
-                'Inspected Qty.': 'sum'
-            }).reset_index()
-            
-            monthly_data['Date'] = monthly_data['Date'].dt.to_timestamp()
-            monthly_data['Rejection_Rate'] = (monthly_data['Total Rej Qty.'] / monthly_data['Inspected Qty.']) * 100
+            # Monthly trend analysis, aggregated at load
+            monthly_data = self._monthly_data
             
             # Create comprehensive trend chart
-            fig = go.Figure()
+            plt = _pyplot()
+            fig, ax = plt.subplots(figsize=(12, 6))
             
             # Add rejection quantity trend
-            fig.add_trace(go.Scatter(
-                x=monthly_data['Date'],
-                y=monthly_data['Total Rej Qty.'],
-                mode='lines+markers',
-                name='Total Rejections',
-                line=dict(color='red', width=3),
-                marker=dict(size=8),
-                yaxis='y'
-            ))
+            ax.plot(monthly_data['Date'], monthly_data['Total Rej Qty.'],
+                    color='red', linewidth=3, marker='o', markersize=8, label='Total Rejections')
+            ax.set_xlabel('Month')
+            ax.set_ylabel('Total Rejections')
             
             # Add rejection rate trend on secondary axis
-            fig.add_trace(go.Scatter(
-                x=monthly_data['Date'],
-                y=monthly_data['Rejection_Rate'],
-                mode='lines+markers',
-                name='Rejection Rate (%)',
-                line=dict(color='orange', width=2, dash='dash'),
-                marker=dict(size=6),
-                yaxis='y2'
-            ))
-            
-            fig.update_layout(
-                title='Smart Trend Analysis: Quality Performance Over Time',
-                xaxis_title='Month',
-                yaxis=dict(title='Total Rejections', side='left'),
-                yaxis2=dict(title='Rejection Rate (%)', side='right', overlaying='y'),
-                height=600,
-                width=1200,
-                showlegend=True,
-                hovermode='x unified'
-            )
-            
-            img_bytes = fig.to_image(format="png", width=1200, height=600)
-            img_base64 = base64.b64encode(img_bytes).decode()
-            
-            # Generate trend insights
-            latest_rejections = monthly_data['Total Rej Qty.'].iloc[-1]
-            first_rejections = monthly_data['Total Rej Qty.'].iloc[0]
-            trend_direction = "improving ⬇️" if latest_rejections < first_rejections else "worsening ⬆️"
-            
-            latest_rate = monthly_data['Rejection_Rate'].iloc[-1]
-            avg_rate = monthly_data['Rejection_Rate'].mean()
-            
-            response = f"📈 **Smart Trend Analysis**\n\n"
-            response += f"📊 **Trend Direction**: Quality is {trend_direction}\n"
-            response += f"🎯 **Current Status**: {latest_rejections:,} rejections, {latest_rate:.2f}% rate\n"
-            response += f"📋 **Benchmark**: Average rate is {avg_rate:.2f}%\n"
-            response += f"⏱️ **Analysis Period**: {len(monthly_data)} months\n\n"
-            
-            if latest_rate > avg_rate * 1.2:
-                response += f"🚨 **Alert**: Current rejection rate is {((latest_rate/avg_rate-1)*100):.0f}% above average!\n\n"
-            elif latest_rate < avg_rate * 0.8:
-                response += f"✅ **Good News**: Current rate is {((1-latest_rate/avg_rate)*100):.0f}% below average!\n\n"
-            
-            response += f"📈 **Generated Chart:**\n"
-            response += f"data:image/png;base64,{img_base64}"
-            
-            return response
+            ax2 = ax.twinx()
+            ax2.plot(monthly_data['Date'], monthly_data['Rejection_Rate'],
+                     color='orange', linewidth=2, linestyle='--', marker='o', markersize=6, label='Rejection Rate (%)')
+            ax2.set_ylabel('Rejection Rate (%)')
+            
+            lines = [*ax.get_lines(), *ax2.get_lines()]
+            ax.legend(lines, [line.get_label() for line in lines], loc='upper left')
+            ax.set_title('Smart Trend Analysis: Quality Performance Over Time')
+            fig.autofmt_xdate()
+            
+            img_base64 = _figure_to_base64(fig)
+            
+            # Generate trend insights from the plain arrays
+            rejections = monthly_data['Total Rej Qty.'].to_numpy()
+            latest_rejections = float(rejections[-1])
+            trend_direction = "improving ⬇️" if latest_rejections < rejections[0] else "worsening ⬆️"
+            
+            rates = monthly_data['Rejection_Rate'].to_numpy()
+            latest_rate = float(rates[-1])
+            avg_rate = float(rates.mean())
+            
+            out = []
+            out.append(f"📈 **Smart Trend Analysis**\n\n")
+            out.append(f"📊 **Trend Direction**: Quality is {trend_direction}\n")
+            out.append(f"🎯 **Current Status**: {latest_rejections:,.0f} rejections, {latest_rate:.2f}% rate\n")
+            out.append(f"📋 **Benchmark**: Average rate is {avg_rate:.2f}%\n")
+            out.append(f"⏱️ **Analysis Period**: {len(monthly_data)} months\n\n")
+            
+            # Compare against the average once (no alert when the average is zero)
+            ratio = latest_rate / avg_rate if avg_rate else 1.0
+            if ratio > 1.2:
+                out.append(f"🚨 **Alert**: Current rejection rate is {(ratio - 1) * 100:.0f}% above average!\n\n")
+            elif ratio < 0.8:
+                out.append(f"✅ **Good News**: Current rate is {(1 - ratio) * 100:.0f}% below average!\n\n")
+            
+            out.append(f"📈 **Generated Chart:**\n")
+            out.append(f"data:image/png;base64,{img_base64}")
+            
+            return ''.join(out)
             
         except Exception as e:
             return f"❌ **Error creating trend chart:** {str(e)}"
     
-    def handle_defect_analysis(self, question, analysis):
+    def handle_defect_analysis(self, question, question_lower, analysis):
         """Handle defect-related questions with smart analysis"""
-        if 'chart' in question.lower() or 'graph' in question.lower():
-            return self.create_smart_visualization(question, analysis)
+        if self._HANDLER_CHART_RE.search(question_lower):
+            return self.create_smart_visualization(question, question_lower, analysis)
         
         # Provide smart defect analysis
         count = analysis['specific_count'] or 5
         return self.get_top_rejection_reasons(count)
     
-    def handle_parts_analysis(self, question, analysis):
+    def handle_parts_analysis(self, question, question_lower, analysis):
         """Handle parts-related questions with smart analysis"""
-        if 'chart' in question.lower() or 'graph' in question.lower():
-            return self.create_smart_visualization(question, analysis)
+        if self._HANDLER_CHART_RE.search(question_lower):
+            return self.create_smart_visualization(question, question_lower, analysis)
         
         # Smart parts analysis
-        if 'highest' in question.lower():
-            top_part = self.df.groupby('Part Name')['Total Rej Qty.'].sum().sort_values(ascending=False)
+        if 'highest' in question_lower:
+            top_part = self._part_totals.nlargest(1)
             return f"🔧 **Highest Rejections**: {top_part.index[0]} with {top_part.iloc[0]:,} total rejections"
         
         return "🔧 **Parts analysis available**. Ask about specific parts or request charts!"
     
-    def handle_trend_analysis(self, question, analysis):
+    def handle_trend_analysis(self, question, question_lower, analysis):
         """Handle trend-related questions"""
-        if 'chart' in question.lower() or 'graph' in question.lower():
-            return self.create_smart_visualization(question, analysis)
+        if self._HANDLER_CHART_RE.search(question_lower):
+            return self.create_smart_visualization(question, question_lower, analysis)
+        
+        # Basic trend analysis over the monthly totals aggregated at load
+        monthly_trends = self._monthly_data['Total Rej Qty.']
+        if monthly_trends.empty:
+            return "📈 **Trend**: No dated records available for trend analysis."
         
-        # Basic trend analysis
-        monthly_trends = self.df.groupby(self.df['Date'].dt.to_period('M'))['Total Rej Qty.'].sum()
-        trend_direction = "improving" if monthly_trends.iloc[-1] < monthly_trends.iloc[0] else "declining"
+        first, latest = monthly_trends.iat[0], monthly_trends.iat[-1]
+        trend_direction = "improving" if latest < first else "declining"
         
-        return f"📈 **Trend**: Quality is {trend_direction}. Latest: {monthly_trends.iloc[-1]}, Start: {monthly_trends.iloc[0]}"
+        return f"📈 **Trend**: Quality is {trend_direction}. Latest: {latest:.0f}, Start: {first:.0f}"
     
     def answer_question(self, question):
         """Enhanced question answering with smarter detection"""
         question_lower = question.lower()
         
         # Check for chart/visualization requests first
-        if any(word in question_lower for word in ['chart', 'graph', 'plot', 'draw', 'show', 'visualize', 'pie', 'bar', 'line']):
-            return self.generate_intelligent_response(question)
-        
-        # Enhanced pattern matching for rejection reason queries
-        rejection_patterns = [
-            r'top\s*(\d+)?\s*(rejection|defect|cause)',
-            r'(tell|show|list|give)\s*(me\s*)?(top|highest|most)\s*(\d+)?\s*(rejection|defect|reason)',
-            r'most\s*(frequent|common)\s*(rejection|defect)',
-            r'highest\s*(rejection|defect)',
-            r'(rejection|defect)\s*reason',
-            r'(why|what)\s*.*(reject|fail)',
-        ]
+        if self._CHART_RE.search(question_lower):
+            return self.generate_intelligent_response(question, question_lower)
         
         # Check if this is asking for rejection reasons
         is_rejection_query = False
         requested_count = 5  # default
         
-        for pattern in rejection_patterns:
-            match = re.search(pattern, question_lower)
-            if match:
-                is_rejection_query = True
-                # Try to extract the number if specified
-                numbers = re.findall(r'\d+', question_lower)
-                if numbers:
-                    try:
-                        requested_count = int(numbers[0])
-                        # Limit to reasonable range
-                        requested_count = min(max(requested_count, 1), 20)
-                    except:
-                        requested_count = 5
-                break
+        # Enhanced pattern matching for rejection reason queries
+        match = self._REJECTION_RE.search(question_lower)
+        if match:
+            is_rejection_query = True
+            # Use the count next to top/most if captured, else any number
+            number = match.group('n1') or match.group('n2')
+            if number is None:
+                number_match = self._NUMBER_RE.search(question_lower)
+                number = number_match.group() if number_match else None
+            if number:
+                # Limit to reasonable range
+                requested_count = min(max(int(number), 1), 20)
         
         if is_rejection_query:
             return self.get_top_rejection_reasons(requested_count)
         
         # Use intelligent response for other questions
-        return self.generate_intelligent_response(question)
+        return self.generate_intelligent_response(question, question_lower)
 
 # Test the enhanced analyzer
 def test_enhanced_analyzer():
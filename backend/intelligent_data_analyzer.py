@@ -1,16 +1,146 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import seaborn as sns
-from collections import Counter
 import re
 import os
-import plotly.graph_objects as go
-import plotly.express as px
-import base64
-import io
-from PIL import Image
+from functools import lru_cache
+from cachetools import LRUCache
+
+try:
+    import python_calamine
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+    print("⚠️ python-calamine not available - using openpyxl for Excel files")
+
+try:
+    from pybase64 import b64encode
+    HAS_PYBASE64 = True
+except ImportError:
+    from base64 import b64encode
+    HAS_PYBASE64 = False
+    print("⚠️ pybase64 not available - using the standard library base64 encoder")
+
+@lru_cache(maxsize=None)
+def _plotly():
+    """Import plotly on the first chart request so text-only answers skip it"""
+    import plotly.graph_objects as go
+    import plotly.io as pio
+    # Charts carry no LaTeX, so spare the Kaleido renderer from loading MathJax
+    scope = getattr(pio.kaleido, 'scope', None)
+    if scope is not None:
+        scope.mathjax = None
+    return go
+
+# Tallest chart we lay out or render; bar heights grow with the number of bars
+_MAX_CHART_HEIGHT = 4000
+
+# Layout shared by every bar and pie chart; only titles and height vary
+_BAR_LAYOUT = {'margin': {'l': 200, 'r': 50, 't': 80, 'b': 50}}
+_PIE_LAYOUT = {
+    'showlegend': True,
+    'legend': {'orientation': 'v', 'yanchor': 'top', 'y': 1, 'xanchor': 'left', 'x': 1.01}
+}
+
+def _bar_chart(values, labels, title, value_title, label_title, height):
+    """Horizontal bar figure, largest bar on top, with the shared bar layout"""
+    go = _plotly()
+    return go.Figure(
+        go.Bar(x=values, y=labels, orientation='h'),
+        layout=dict(
+            _BAR_LAYOUT,
+            title=title,
+            height=min(height, _MAX_CHART_HEIGHT),
+            xaxis={'title': value_title},
+            yaxis={'title': label_title, 'categoryorder': 'total ascending'}
+        )
+    )
+
+def _pie_chart(values, labels, title):
+    """Pie figure labelled inside the slices, with the shared pie layout"""
+    go = _plotly()
+    return go.Figure(
+        go.Pie(values=values, labels=labels, textposition='inside', textinfo='percent+label'),
+        layout=dict(_PIE_LAYOUT, title=title)
+    )
+
+# Record-level columns; every other named column is a defect type
+_BASIC_COLUMNS = frozenset(['Unnamed: 0', 'Date', 'Inspected Qty.', 'Part Name', 'Total Rej Qty.'])
+
+# Question vocabulary, built once at import
+_MONTH_NUMBERS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4,
+    'may': 5, 'june': 6, 'july': 7, 'august': 8,
+    'september': 9, 'october': 10, 'november': 11, 'december': 12
+}
+_CONTEXT_WORDS = ('why', 'how', 'what caused', 'reason', 'because', 'this part', 'that part', 'why this', 'why that')
+_DEFECT_KEYWORDS = ('burr', 'damage', 'toolmark', 'oversize', 'undersize', 'drilling', 'milling', 'boring')
+_CHART_DEFECT_KEYWORDS = _DEFECT_KEYWORDS[:-1]
+_CHART_WORDS = ('chart', 'graph', 'plot', 'draw', 'create', 'show', 'visualize')
+_ANALYSIS_CHART_WORDS = _CHART_WORDS[:-1]
+_SURFACE_DEFECT_WORDS = ('burr', 'mark', 'damage', 'scratch')
+
+# Question parsing patterns, compiled once at import
+_MONTH_NAMES = '|'.join(_MONTH_NUMBERS)
+_PART_IN_ANSWER_RE = re.compile(r'([A-Z][A-Z\s\d-]+\d+(?:-\d+)?)')
+_PART_IN_QUESTION_RE = re.compile(r'part\s+(number|name)\s+([A-Z][A-Z\s\d-]+\d+(?:-\d+)?)')
+_PART_CODE_IN_ANSWER_RE = re.compile(r'([A-Z]{5,}\s*[A-Z]*\s*\d+(?:-\d+)?)')
+_MACHINE_RE = re.compile(r'machine\s*(?:no\.?\s*)?(\d+)')
+_QUOTED_PART_RE = re.compile(r'["\']([^"\']+)["\']|(\d{8,})')
+_DAY_MONTH_YEAR_RE = re.compile(rf'(\d{{1,2}})(?:st|nd|rd|th)?\s+({_MONTH_NAMES})\s+(\d{{4}})')
+_MONTH_YEAR_RE = re.compile(rf'({_MONTH_NAMES})\s+(\d{{4}})')
+_TOP_N_RE = re.compile(r'top\s*(\d+)')
+_CHART_PART_RE = re.compile(r'part\s+([A-Z][A-Z\s\d-]+)')
+
+# answer_question routing, checked in order: (keyword groups that must each
+# match, keywords that must not, handler, whether to remember the answer).
+# Keywords match as substrings, so 'part' also covers 'parts'.
+_QUESTION_ROUTES = (
+    (({'machine'},), (), 'handle_machine_questions', True),
+    (({'part'}, {'highest', 'lowest', 'rejection'}), (), 'handle_part_questions', True),
+    (({'which part'},), (), 'handle_part_questions', True),
+    (({'part number'},), ('total',), 'handle_part_questions', True),
+    (({'date', 'day', 'month', 'year', 'when'},), ('part',), 'handle_date_questions', False),
+    (({'reason', 'defect', 'burr', 'damage', 'toolmark'},), ('part',), 'handle_defect_questions', False),
+    (({'total', 'count', 'number', 'quantity', 'how many'},), ('part',), 'handle_quantity_questions', False),
+    (({'date', 'day'}, {'highest', 'lowest'}), (), 'handle_date_questions', False),
+    (({'reason', 'defect', 'frequent'}, {'highest', 'lowest', 'most'}), (), 'handle_defect_questions', False),
+    (({'ratio', 'percentage', 'rate'},), (), 'handle_ratio_questions', False),
+    (({'trend', 'analysis', 'chart', 'graph'},), (), 'handle_analysis_questions', False),
+)
+_ROUTE_KEYWORDS = frozenset(
+    word
+    for groups, excluded, _, _ in _QUESTION_ROUTES
+    for word in (*(w for group in groups for w in group), *excluded)
+)
+
+# analyze_chart_request rules, first match wins: (keywords, chart or data type)
+_CHART_TYPE_RULES = (
+    ({'pie'}, 'pie'),
+    ({'line', 'trend'}, 'line'),
+    ({'bar'}, 'bar'),
+)
+_CHART_DATA_RULES = (
+    ({'part', 'component'}, 'parts'),
+    ({'trend', 'time', 'monthly', 'daily', 'over time'}, 'trends'),
+    ({'defect', 'rejection', 'reason', 'cause'}, 'rejections'),
+    ({'monthly'}, 'monthly'),
+)
+_CHART_KEYWORDS = frozenset(
+    word
+    for rules in (_CHART_TYPE_RULES, _CHART_DATA_RULES)
+    for words, _ in rules
+    for word in words
+).union(_CHART_DEFECT_KEYWORDS, _MONTH_NUMBERS)
+
+# generate_intelligent_chart dispatch: analyzed data type -> chart builder
+_CHART_BUILDERS = {
+    'rejections': 'create_rejection_reasons_chart',
+    'trends': 'create_trend_chart',
+    'parts': 'create_parts_analysis_chart',
+    'defects': 'create_defect_analysis_chart',
+    'monthly': 'create_monthly_analysis_chart',
+}
 
 class IntelligentDataAnalyzer:
     def __init__(self, file_path):
@@ -27,6 +157,12 @@ class IntelligentDataAnalyzer:
             'mentioned_defects': [],
             'context': {}
         }
+        # Charts are embedded as base64 PNG; CHART_RENDER_MODE=svg embeds a
+        # base64 SVG instead, and CHART_RENDER_MODE=json sends the Plotly
+        # figure JSON for clients that render with Plotly.js
+        self.chart_render_mode = os.getenv('CHART_RENDER_MODE', 'png').lower()
+        # Rendered chart images (base64) keyed by figure JSON, size and format
+        self.chart_image_cache = LRUCache(maxsize=64)
         self.load_and_analyze_data()
     
     def load_and_analyze_data(self):
@@ -34,7 +170,7 @@ class IntelligentDataAnalyzer:
         try:
             # Load the file
             if self.file_path.endswith('.xlsx'):
-                self.df = pd.read_excel(self.file_path)
+                self.df = self.read_excel_file()
             elif self.file_path.endswith('.csv'):
                 self.df = pd.read_csv(self.file_path)
             else:
@@ -43,50 +179,169 @@ class IntelligentDataAnalyzer:
             # Convert date column
             if 'Date' in self.df.columns:
                 self.df['Date'] = pd.to_datetime(self.df['Date'])
+                # Keep rows in date order so date ranges are binary-searchable slices
+                self.df = self.df.sort_values('Date', kind='stable', ignore_index=True)
+            
+            # Part names repeat on every row: store them as integer category codes
+            if 'Part Name' in self.df.columns:
+                self.df['Part Name'] = self.df['Part Name'].astype('category')
             
             # Identify key columns
             self.identify_columns()
             
+            # Store counts in 32-bit types to halve the bytes every reduction reads
+            self.downcast_numeric_columns()
+            
             # Generate metadata
             self.generate_metadata()
             
+            # Defect counts now live in the aggregates above, so keep only the
+            # columns the row-level date and part answers still read
+            self.df = self.df[[col for col in self.df.columns if col in _BASIC_COLUMNS]]
+            
             print("✅ Data loaded successfully!")
-            print(f"📊 Records: {len(self.df)}")
-            print(f"📅 Date range: {self.df['Date'].min()} to {self.df['Date'].max()}")
-            print(f"🔧 Unique parts: {self.df['Part Name'].nunique()}")
-            print(f"❌ Total rejections: {self.df['Total Rej Qty.'].sum()}")
+            print(f"📊 Records: {self.metadata['total_records']}")
+            print(f"📅 Date range: {self.metadata['date_range']['start']} to {self.metadata['date_range']['end']}")
+            print(f"🔧 Unique parts: {self.metadata['unique_parts']}")
+            print(f"❌ Total rejections: {self.metadata['total_rejections']}")
             
         except Exception as e:
             print(f"❌ Error loading data: {e}")
     
+    def read_excel_file(self):
+        """Read the workbook with the streaming calamine parser when available"""
+        if HAS_CALAMINE:
+            try:
+                return pd.read_excel(self.file_path, engine='calamine')
+            except ValueError:
+                # pandas older than 2.2 has no calamine engine
+                pass
+        # openpyxl is already opened read-only by pandas
+        return pd.read_excel(self.file_path, engine='openpyxl')
+    
     def identify_columns(self):
         """Identify and categorize different types of columns"""
-        # Identify defect columns (all columns except basic info)
-        basic_cols = ['Unnamed: 0', 'Date', 'Inspected Qty.', 'Part Name', 'Total Rej Qty.']
-        self.defect_columns = [col for col in self.df.columns if col not in basic_cols and not col.startswith('Unnamed')]
+        # Identify defect columns (all named columns except basic info) in one pass
+        self.defect_columns = [
+            col for col in self.df.columns
+            if col not in _BASIC_COLUMNS and isinstance(col, str) and col.strip() and not col.startswith('Unnamed')
+        ]
         
-        # Clean up defect columns (remove empty or unnamed columns)
-        self.defect_columns = [col for col in self.defect_columns if not pd.isna(col) and col.strip()]
+        # Tag sizing and surface defect types once, for the part insights
+        lowered = [(col, col.lower()) for col in self.defect_columns]
+        self._sizing_defects = frozenset(col for col, low in lowered if 'size' in low)
+        self._surface_defects = frozenset(
+            col for col, low in lowered if any(word in low for word in _SURFACE_DEFECT_WORDS)
+        )
+    
+    def downcast_numeric_columns(self):
+        """Store defect counts and quantities as int32, or float32 when not whole numbers"""
+        int32_max = np.iinfo(np.int32).max
+        quantity_cols = [col for col in ('Inspected Qty.', 'Total Rej Qty.') if col in self.df.columns]
+        for col in [*self.defect_columns, *quantity_cols]:
+            values = pd.to_numeric(self.df[col], errors='coerce')
+            if col in self.defect_columns:
+                # A blank defect cell means no defects of that type
+                values = values.fillna(0)
+            whole = values.notna().all() and (values % 1 == 0).all() and values.abs().max() <= int32_max
+            self.df[col] = values.astype(np.int32 if whole else np.float32)
     
     def generate_metadata(self):
         """Generate comprehensive metadata about the dataset"""
+        # Defect counts as one NumPy block (already downcast, blanks as 0), so
+        # whole-column totals are a single reduction
+        defect_frame = self.df[self.defect_columns]
+        defect_matrix = defect_frame.to_numpy()
+        
+        # Defect totals never change after load, so sum every column once
+        self._defect_totals = pd.Series(defect_matrix.sum(axis=0), index=defect_frame.columns)
+        self._active_defect_totals = self._defect_totals[self._defect_totals > 0]
+        self._total_defect_rejections = self._active_defect_totals.sum()
+        self._top_defects_answers = {}
+        self._general_answer = None
+        
+        # Per-part totals and defect breakdown (parts x defects), so part
+        # questions only index these small tables
+        part_groups = self.df.groupby('Part Name', observed=True)
+        self._part_summary = part_groups.agg(**{
+            'Total Rej Qty.': ('Total Rej Qty.', 'sum'),
+            'Inspected Qty.': ('Inspected Qty.', 'sum'),
+            'records': ('Total Rej Qty.', 'size')
+        })
+        self._part_defect = defect_frame.groupby(self.df['Part Name'], observed=True).sum()
+        
+        # Per-part, per-day and per-month rejection aggregates for the handlers
+        self._part_rej_sum = self._part_summary['Total Rej Qty.']
+        self._part_rej_mean = part_groups['Total Rej Qty.'].mean()
+        self._daily_rej = self.df.groupby('Date')['Total Rej Qty.'].sum()
+        self._monthly = self.df.groupby(self.df['Date'].dt.to_period('M')).agg({
+            'Total Rej Qty.': 'sum',
+            'Inspected Qty.': 'sum'
+        })
+        self._monthly_rej = self._monthly['Total Rej Qty.']
+        
+        # Chart-ready months (month-start dates and rejection rate) for the trend charts
+        self._monthly_trend = self._monthly.reset_index()
+        self._monthly_trend['Date'] = self._monthly_trend['Date'].dt.to_timestamp()
+        self._monthly_trend['Rejection_Rate'] = (self._monthly_trend['Total Rej Qty.'] / self._monthly_trend['Inspected Qty.']) * 100
+        
+        # Sorted date column (NaT last) for searchsorted date range lookups
+        self._date_values = self.df['Date'].to_numpy()
+        
+        # Part names and row positions keyed by lowercased name, for part lookups
+        self._part_names = {}
+        self._part_rows = {}
+        for name, rows in part_groups.indices.items():
+            if isinstance(name, str):
+                key = name.lower()
+                self._part_names.setdefault(key, []).append(name)
+                self._part_rows[key] = np.concatenate([self._part_rows[key], rows]) if key in self._part_rows else rows
+        
+        # Date range and part count come from the small aggregates built above
+        # (both skip missing dates and part names) rather than rescanning rows
         self.metadata = {
             'total_records': len(self.df),
             'date_range': {
-                'start': self.df['Date'].min(),
-                'end': self.df['Date'].max()
+                'start': self._daily_rej.index.min(),
+                'end': self._daily_rej.index.max()
             },
-            'unique_parts': self.df['Part Name'].nunique(),
+            'unique_parts': len(self._part_summary),
             'part_names': self.df['Part Name'].unique().tolist(),
             'total_rejections': self.df['Total Rej Qty.'].sum(),
             'defect_types': self.defect_columns,
-            'months_available': sorted(self.df['Date'].dt.to_period('M').unique().astype(str)),
+            'months_available': self._monthly.index.astype(str).tolist(),
             'daily_stats': {
-                'max_daily_rejection': self.df.groupby('Date')['Total Rej Qty.'].sum().max(),
-                'avg_daily_rejection': self.df.groupby('Date')['Total Rej Qty.'].sum().mean()
+                'max_daily_rejection': self._daily_rej.max(),
+                'avg_daily_rejection': self._daily_rej.mean()
             }
         }
     
+    def get_rows_between(self, start, end):
+        """Rows dated in [start, end), sliced from the date-sorted frame"""
+        lo, hi = np.searchsorted(self._date_values, [pd.Timestamp(start).to_datetime64(), pd.Timestamp(end).to_datetime64()])
+        return self.df.iloc[lo:hi]
+    
+    def get_month_total(self, year, month):
+        """Rejections in the given calendar month, or None when it has no rows"""
+        return self._monthly_rej.get(pd.Period(year=year, month=month, freq='M'))
+    
+    def get_part_names(self, part_name):
+        """Part names that contain part_name (case-insensitive)"""
+        query = part_name.lower()
+        return [name for key, names in self._part_names.items() if query in key for name in names]
+    
+    def get_part_positions(self, part_name):
+        """Sorted row positions whose part name contains part_name (case-insensitive)"""
+        query = part_name.lower()
+        matches = [rows for name, rows in self._part_rows.items() if query in name]
+        if not matches:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(matches))
+    
+    def get_part_data(self, part_name):
+        """Rows whose part name contains part_name (case-insensitive)"""
+        return self.df.iloc[self.get_part_positions(part_name)]
+    
     def answer_question(self, question):
         """Intelligently answer any question about the data"""
         question_lower = question.lower()
@@ -102,47 +357,14 @@ class IntelligentDataAnalyzer:
             self.conversation_memory['last_answer'] = context_response
             return context_response
         
-        # Machine-related questions
-        if 'machine' in question_lower:
-            response = self.handle_machine_questions(question)
-            self.conversation_memory['last_answer'] = response
-            return response
-        
-        # Part-related questions (check more comprehensively)
-        if ('part' in question_lower and ('highest' in question_lower or 'lowest' in question_lower or 'rejection' in question_lower)) or \
-           ('which part' in question_lower) or \
-           ('part number' in question_lower and 'total' not in question_lower):
-            response = self.handle_part_questions(question)
-            self.conversation_memory['last_answer'] = response
-            return response
-        
-        # Date-related questions (but not if it's asking about parts on dates)
-        if any(word in question_lower for word in ['date', 'day', 'month', 'year', 'when']) and 'part' not in question_lower:
-            return self.handle_date_questions(question)
-        
-        # Rejection reason questions
-        if any(word in question_lower for word in ['reason', 'defect', 'burr', 'damage', 'toolmark']) and 'part' not in question_lower:
-            return self.handle_defect_questions(question)
-        
-        # Quantity/count questions
-        if any(word in question_lower for word in ['total', 'count', 'number', 'quantity', 'how many']) and 'part' not in question_lower:
-            return self.handle_quantity_questions(question)
-        
-        # Date-specific highest/lowest questions
-        if any(word in question_lower for word in ['date', 'day']) and any(word in question_lower for word in ['highest', 'lowest']):
-            return self.handle_date_questions(question)
-        
-        # Defect-specific highest/lowest questions  
-        if any(word in question_lower for word in ['reason', 'defect', 'frequent']) and any(word in question_lower for word in ['highest', 'lowest', 'most']):
-            return self.handle_defect_questions(question)
-        
-        # Ratio/percentage questions
-        if any(word in question_lower for word in ['ratio', 'percentage', 'rate']):
-            return self.handle_ratio_questions(question)
-        
-        # Trend/analysis questions (fallback for general analysis)
-        if any(word in question_lower for word in ['trend', 'analysis', 'chart', 'graph']):
-            return self.handle_analysis_questions(question)
+        # Find every routing keyword once, then walk the route table with set operations
+        hits = {word for word in _ROUTE_KEYWORDS if word in question_lower}
+        for groups, excluded, handler, remember in _QUESTION_ROUTES:
+            if all(not hits.isdisjoint(group) for group in groups) and hits.isdisjoint(excluded):
+                response = getattr(self, handler)(question)
+                if remember:
+                    self.conversation_memory['last_answer'] = response
+                return response
         
         # General questions
         response = self.handle_general_questions(question)
@@ -156,13 +378,11 @@ class IntelligentDataAnalyzer:
         last_answer = self.conversation_memory.get('last_answer', '')
         
         # Look for context clues in follow-up questions
-        context_words = ['why', 'how', 'what caused', 'reason', 'because', 'this part', 'that part', 'why this', 'why that']
-        
-        if any(word in question_lower for word in context_words) and last_answer:
+        if any(word in question_lower for word in _CONTEXT_WORDS) and last_answer:
             # Attempt to derive part context from last question or answer if it mentioned a specific part
-            part_match = re.search(r'([A-Z][A-Z\s\d-]+\d+(?:-\d+)?)', last_answer) or \
-                         re.search(r'part\s+(number|name)\s+([A-Z][A-Z\s\d-]+\d+(?:-\d+)?)', last_question) or \
-                         re.search(r'([A-Z]{5,}\s*[A-Z]*\s*\d+(?:-\d+)?)', last_answer)
+            part_match = _PART_IN_ANSWER_RE.search(last_answer) or \
+                         _PART_IN_QUESTION_RE.search(last_question) or \
+                         _PART_CODE_IN_ANSWER_RE.search(last_answer)
             
             if part_match:
                 part_name = part_match.group(1) if part_match.group(1) else part_match.group(2)
@@ -197,33 +417,28 @@ class IntelligentDataAnalyzer:
     def analyze_part_rejection_reasons(self, part_name):
         """Analyze why a specific part has high rejections"""
         try:
-            # Get data for this specific part
-            part_data = self.df[self.df['Part Name'].str.contains(part_name, na=False, case=False)]
+            # Look up the precomputed totals for the matching part(s)
+            part_names = self.get_part_names(part_name)
             
-            if len(part_data) == 0:
+            if not part_names:
                 return f"❌ **Answer:** No data found for part '{part_name}'."
             
+            part_summary = self._part_summary.loc[part_names]
+            
             # Calculate total rejections for this part
-            total_rejections = part_data['Total Rej Qty.'].sum()
+            total_rejections = part_summary['Total Rej Qty.'].sum()
             
             # Find top defect types for this part
-            defect_analysis = []
-            for col in self.defect_columns:
-                if col in part_data.columns:
-                    defect_total = part_data[col].sum()
-                    if defect_total > 0:
-                        percentage = (defect_total / total_rejections) * 100
-                        defect_analysis.append((col, defect_total, percentage))
-            
-            # Sort by quantity and take top 5
-            defect_analysis.sort(key=lambda x: x[1], reverse=True)
-            top_defects = defect_analysis[:5]
+            defect_totals = self._part_defect.loc[part_names].sum()
+            top_totals = defect_totals[defect_totals > 0].nlargest(5)
+            percentages = top_totals / total_rejections * 100
+            top_defects = list(zip(top_totals.index, top_totals.tolist(), percentages.tolist()))
             
             if not top_defects:
                 return f"✅ **Answer:** {part_name} has {total_rejections} total rejections, but specific defect breakdown is not available."
             
             # Calculate frequency (how often this part gets rejected)
-            total_inspected = part_data['Inspected Qty.'].sum()
+            total_inspected = part_summary['Inspected Qty.'].sum()
             rejection_rate = (total_rejections / total_inspected * 100) if total_inspected > 0 else 0
             
             # Build comprehensive answer
@@ -231,7 +446,7 @@ class IntelligentDataAnalyzer:
             answer += f"📊 **Overall Impact:**\n"
             answer += f"• Total rejections: {total_rejections:,} parts\n"
             answer += f"• Rejection rate: {rejection_rate:.2f}%\n"
-            answer += f"• Data points: {len(part_data)} days\n\n"
+            answer += f"• Data points: {part_summary['records'].sum()} days\n\n"
             
             answer += f"🎯 **Top Defect Types:**\n"
             for i, (defect, count, percentage) in enumerate(top_defects, 1):
@@ -244,8 +459,8 @@ class IntelligentDataAnalyzer:
                     answer += f"\n💡 **Key Insight:** Top 2 defects account for {top_two_percentage:.1f}% of rejections - focus on these for maximum impact.\n"
             
             # Check for specific defect patterns
-            sizing_defects = [d for d in top_defects if 'size' in d[0].lower()]
-            surface_defects = [d for d in top_defects if any(word in d[0].lower() for word in ['burr', 'mark', 'damage', 'scratch'])]
+            sizing_defects = [d for d in top_defects if d[0] in self._sizing_defects]
+            surface_defects = [d for d in top_defects if d[0] in self._surface_defects]
             
             if sizing_defects:
                 answer += f"\n⚠️ **Process Issue:** Sizing problems detected - may indicate tool wear or setup issues.\n"
@@ -261,7 +476,7 @@ class IntelligentDataAnalyzer:
     def get_part_detailed_analysis(self, part_name):
         """Get detailed analysis for a specific part"""
         try:
-            part_data = self.df[self.df['Part Name'].str.contains(part_name, na=False, case=False)]
+            part_data = self.get_part_data(part_name)
             
             if len(part_data) == 0:
                 return f"❌ **Answer:** No data found for part '{part_name}'."
@@ -286,14 +501,14 @@ class IntelligentDataAnalyzer:
     def handle_machine_questions(self, question):
         """Handle questions about machines"""
         # Extract machine number if present
-        machine_match = re.search(r'machine\s*(?:no\.?\s*)?(\d+)', question.lower())
+        machine_match = _MACHINE_RE.search(question.lower())
         
         if machine_match:
             machine_num = machine_match.group(1)
             return f"❌ **Answer:** Machine No. {machine_num} is not identified in the data. The dataset tracks rejections by part names/components, not by specific machine numbers."
         
         if 'this month' in question.lower():
-            current_month = self.df['Date'].dt.to_period('M').max()
+            current_month = self._monthly.index.max()
             return f"❌ **Answer:** No machine identifiers found in the data. The dataset only contains part names. Latest available data is for {current_month}."
         
         return "❌ **Answer:** The dataset does not contain machine identifiers. Data is organized by part names/components only."
@@ -301,44 +516,38 @@ class IntelligentDataAnalyzer:
     def handle_part_questions(self, question):
         """Handle questions about specific parts"""
         # Extract part number if present
-        part_match = re.search(r'["\']([^"\']+)["\']|(\d{8,})', question)
+        part_match = _QUOTED_PART_RE.search(question)
         
         if part_match:
             part_num = part_match.group(1) or part_match.group(2)
-            matching_parts = self.df[self.df['Part Name'].str.contains(part_num, na=False, case=False)]
+            matching_parts = self.get_part_names(part_num)
             
-            if len(matching_parts) > 0:
-                total_rej = matching_parts['Total Rej Qty.'].sum()
+            if matching_parts:
+                total_rej = self._part_summary.loc[matching_parts, 'Total Rej Qty.'].sum()
                 return f"✅ **Answer:** Part containing '{part_num}' has {total_rej} total rejections."
             else:
                 return f"❌ **Answer:** Part number '{part_num}' not found in the data."
         
         # Highest rejections
         if 'highest' in question.lower():
-            top_part = self.df.groupby('Part Name')['Total Rej Qty.'].sum().sort_values(ascending=False)
-            return f"✅ **Answer:** {top_part.index[0]} with {top_part.iloc[0]} total rejections."
+            top_part = self._part_rej_sum.idxmax()
+            return f"✅ **Answer:** {top_part} with {self._part_rej_sum[top_part]} total rejections."
         
         return "❓ **Answer:** Please specify the part number or provide more details about the part."
     
     def handle_date_questions(self, question):
         """Handle date-related questions"""
         # Extract specific date
-        date_match = re.search(r'(\d{1,2})[st|nd|rd|th]*\s+(january|february|march|april|may|june|july|august|september|october|november|december)\s+(\d{4})', question.lower())
+        date_match = _DAY_MONTH_YEAR_RE.search(question.lower())
         
         if date_match:
             day = int(date_match.group(1))
             month_name = date_match.group(2)
             year = int(date_match.group(3))
             
-            month_map = {
-                'january': 1, 'february': 2, 'march': 3, 'april': 4,
-                'may': 5, 'june': 6, 'july': 7, 'august': 8,
-                'september': 9, 'october': 10, 'november': 11, 'december': 12
-            }
-            
             try:
-                target_date = datetime(year, month_map[month_name], day)
-                date_data = self.df[self.df['Date'].dt.date == target_date.date()]
+                target_date = datetime(year, _MONTH_NUMBERS[month_name], day)
+                date_data = self.get_rows_between(target_date, target_date + timedelta(days=1))
                 
                 if len(date_data) > 0:
                     total_rej = date_data['Total Rej Qty.'].sum()
@@ -350,32 +559,24 @@ class IntelligentDataAnalyzer:
                 return "❌ **Answer:** Invalid date format."
         
         # Month-based questions
-        month_match = re.search(r'(january|february|march|april|may|june|july|august|september|october|november|december)\s+(\d{4})', question.lower())
+        month_match = _MONTH_YEAR_RE.search(question.lower())
         
         if month_match:
             month_name = month_match.group(1)
             year = int(month_match.group(2))
             
-            month_map = {
-                'january': 1, 'february': 2, 'march': 3, 'april': 4,
-                'may': 5, 'june': 6, 'july': 7, 'august': 8,
-                'september': 9, 'october': 10, 'november': 11, 'december': 12
-            }
-            
-            month_num = month_map[month_name]
-            month_data = self.df[(self.df['Date'].dt.month == month_num) & (self.df['Date'].dt.year == year)]
+            month_num = _MONTH_NUMBERS[month_name]
+            total_rej = self.get_month_total(year, month_num)
             
-            if len(month_data) > 0:
-                total_rej = month_data['Total Rej Qty.'].sum()
+            if total_rej is not None:
                 return f"✅ **Answer:** {total_rej} rejections in {month_name.title()} {year}."
             else:
                 return f"❌ **Answer:** No data available for {month_name.title()} {year}."
         
         # Highest rejection date
         if 'highest' in question.lower():
-            daily_rejections = self.df.groupby('Date')['Total Rej Qty.'].sum().sort_values(ascending=False)
-            top_date = daily_rejections.index[0]
-            return f"✅ **Answer:** {top_date.strftime('%Y-%m-%d')} with {daily_rejections.iloc[0]} rejections."
+            top_date = self._daily_rej.idxmax()
+            return f"✅ **Answer:** {top_date.strftime('%Y-%m-%d')} with {self._daily_rej[top_date]} rejections."
         
         return "❓ **Answer:** Please specify the date or time period you're asking about."
     
@@ -384,60 +585,19 @@ class IntelligentDataAnalyzer:
         question_lower = question.lower()
         
         # Check if this is a chart/graph request first
-        if any(word in question_lower for word in ['chart', 'graph', 'plot', 'draw', 'create', 'show', 'visualize']):
+        if any(word in question_lower for word in _CHART_WORDS):
             return self.generate_intelligent_chart(question)
         
         # Handle top N rejection reasons
         if any(phrase in question_lower for phrase in ['top', 'highest', 'most', 'frequent']):
             # Check if asking for specific number (top 5, top 10, etc.)
-            import re
-            number_match = re.search(r'top\s*(\d+)', question_lower)
+            number_match = _TOP_N_RE.search(question_lower)
             count = int(number_match.group(1)) if number_match else 5
-            
-            # Calculate totals for all defect columns
-            defect_totals = {}
-            for col in self.defect_columns:
-                if col in self.df.columns:
-                    total = self.df[col].sum()
-                    if total > 0:  # Only include defects that actually occurred
-                        defect_totals[col] = total
-            
-            if not defect_totals:
-                return "❌ **Answer:** No defect data found in the dataset."
-            
-            # Sort by total count and get top N
-            sorted_defects = sorted(defect_totals.items(), key=lambda x: x[1], reverse=True)[:count]
-            
-            if not sorted_defects:
-                return "❌ **Answer:** No rejection data available."
-            
-            # Calculate total rejections for percentage calculation
-            total_rejections = sum(defect_totals.values())
-            
-            # Format the response
-            answer = f"🎯 **Top {len(sorted_defects)} Rejection Reasons:**\n\n"
-            
-            for i, (defect_type, count) in enumerate(sorted_defects, 1):
-                percentage = (count / total_rejections) * 100
-                answer += f"{i}. **{defect_type}**: {count:,} parts ({percentage:.1f}%)\n"
-            
-            # Add summary statistics
-            answer += f"\n📊 **Summary:**\n"
-            answer += f"• Total defect categories: {len(self.defect_columns)}\n"
-            answer += f"• Active defect types: {len(defect_totals)}\n"
-            answer += f"• Total rejections: {total_rejections:,} parts\n"
-            
-            # Add insight about top defects contribution
-            top_3_percentage = sum([x[1] for x in sorted_defects[:3]]) / total_rejections * 100
-            answer += f"• Top 3 defects account for: {top_3_percentage:.1f}% of all rejections\n"
-            
-            return answer
+            return self.get_top_defects_answer(count)
         
         # Extract specific defect type
-        defect_keywords = ['burr', 'damage', 'toolmark', 'oversize', 'undersize', 'drilling', 'milling', 'boring']
-        
         found_defect = None
-        for keyword in defect_keywords:
+        for keyword in _DEFECT_KEYWORDS:
             if keyword in question_lower:
                 # Find matching columns
                 matching_cols = [col for col in self.defect_columns if keyword.lower() in col.lower()]
@@ -446,24 +606,66 @@ class IntelligentDataAnalyzer:
                     break
         
         if found_defect:
-            total_defects = self.df[found_defect].sum()
+            total_defects = self._defect_totals.get(found_defect, 0)
             return f"✅ **Answer:** {total_defects} parts rejected due to '{found_defect}' defect."
         
         # List all defect types
         if 'list' in question_lower or 'all' in question_lower:
-            active_defects = [col for col in self.defect_columns if self.df[col].sum() > 0]
+            active_defects = self._active_defect_totals.index.tolist()
             return f"✅ **Answer:** Available active defect types ({len(active_defects)} total): {', '.join(active_defects[:10])}{'...' if len(active_defects) > 10 else ''}"
         
         # Default fallback - show top 5 rejection reasons
-        return self.handle_defect_questions("top 5 rejection reasons")
+        return self.get_top_defects_answer(5)
+    
+    def get_top_defects_answer(self, count=5):
+        """Format the top N rejection reasons answer (cached per N)"""
+        # Calculate totals for all defect columns
+        defect_totals = self._active_defect_totals
+        
+        if defect_totals.empty:
+            return "❌ **Answer:** No defect data found in the dataset."
+        
+        # Counts past the number of active defects give the same answer
+        count = min(count, len(defect_totals))
+        cached = self._top_defects_answers.get(count)
+        if cached is not None:
+            return cached
+        
+        # Sort by total count and get top N
+        sorted_defects = list(defect_totals.nlargest(count).items())
+        
+        if not sorted_defects:
+            return "❌ **Answer:** No rejection data available."
+        
+        # Calculate total rejections for percentage calculation
+        total_rejections = self._total_defect_rejections
+        
+        # Format the response
+        answer = f"🎯 **Top {len(sorted_defects)} Rejection Reasons:**\n\n"
+        
+        for i, (defect_type, defect_count) in enumerate(sorted_defects, 1):
+            percentage = (defect_count / total_rejections) * 100
+            answer += f"{i}. **{defect_type}**: {defect_count:,} parts ({percentage:.1f}%)\n"
+        
+        # Add summary statistics
+        answer += f"\n📊 **Summary:**\n"
+        answer += f"• Total defect categories: {len(self.defect_columns)}\n"
+        answer += f"• Active defect types: {len(defect_totals)}\n"
+        answer += f"• Total rejections: {total_rejections:,} parts\n"
+        
+        # Add insight about top defects contribution
+        top_3_percentage = sum([x[1] for x in sorted_defects[:3]]) / total_rejections * 100
+        answer += f"• Top 3 defects account for: {top_3_percentage:.1f}% of all rejections\n"
+        
+        self._top_defects_answers[count] = answer
+        return answer
     
     def handle_quantity_questions(self, question):
         """Handle quantity-related questions"""
         # Handle specific month questions
         if 'june 2024' in question.lower():
-            june_data = self.df[(self.df['Date'].dt.month == 6) & (self.df['Date'].dt.year == 2024)]
-            if len(june_data) > 0:
-                total_rej = june_data['Total Rej Qty.'].sum()
+            total_rej = self.get_month_total(2024, 6)
+            if total_rej is not None:
                 return f"✅ **Answer:** {total_rej} rejections in June 2024."
             else:
                 return f"❌ **Answer:** No data available for June 2024."
@@ -477,9 +679,8 @@ class IntelligentDataAnalyzer:
             return f"✅ **Answer:** Total rejections across all data: {total_rej} parts."
         
         if 'this month' in question.lower():
-            current_month = self.df['Date'].dt.to_period('M').max()
-            current_data = self.df[self.df['Date'].dt.to_period('M') == current_month]
-            total_rej = current_data['Total Rej Qty.'].sum()
+            current_month = self._monthly.index.max()
+            total_rej = self._monthly_rej[current_month]
             return f"✅ **Answer:** {total_rej} rejections in {current_month} (latest available month)."
         
         return f"✅ **Answer:** Total rejections in dataset: {self.df['Total Rej Qty.'].sum()}"
@@ -489,17 +690,17 @@ class IntelligentDataAnalyzer:
         question_lower = question.lower()
         
         # Chart/Graph generation requests
-        if any(word in question_lower for word in ['chart', 'graph', 'plot', 'draw', 'create', 'show']):
+        if any(word in question_lower for word in _ANALYSIS_CHART_WORDS):
             return self.generate_intelligent_chart(question)
         
         if 'trend' in question_lower:
-            monthly_trends = self.df.groupby(self.df['Date'].dt.to_period('M'))['Total Rej Qty.'].sum()
+            monthly_trends = self._monthly_rej
             trend_direction = "increasing" if monthly_trends.iloc[-1] > monthly_trends.iloc[0] else "decreasing"
             return f"✅ **Answer:** Rejection trend is {trend_direction}. Latest month: {monthly_trends.iloc[-1]}, First month: {monthly_trends.iloc[0]}"
         
         if 'highest' in question_lower and 'average' in question_lower:
-            part_avg = self.df.groupby('Part Name')['Total Rej Qty.'].mean().sort_values(ascending=False)
-            return f"✅ **Answer:** {part_avg.index[0]} has the highest average daily rejection: {part_avg.iloc[0]:.2f} parts/day."
+            top_part = self._part_rej_mean.idxmax()
+            return f"✅ **Answer:** {top_part} has the highest average daily rejection: {self._part_rej_mean[top_part]:.2f} parts/day."
         
         return "📈 **Answer:** Analysis capability available. Please specify what type of analysis you need."
     
@@ -521,54 +722,54 @@ class IntelligentDataAnalyzer:
             # Analyze the question to understand exactly what the user wants
             chart_analysis = self.analyze_chart_request(question)
             
-            # Generate appropriate chart based on analysis
-            if chart_analysis['data_type'] == 'rejections':
-                return self.create_rejection_reasons_chart(question, chart_analysis)
+            # Generate appropriate chart based on analysis, handing the analysis
+            # on so no builder has to parse the question again
+            builder = _CHART_BUILDERS.get(chart_analysis['data_type'])
+            if builder:
+                return getattr(self, builder)(question, chart_analysis)
             
-            elif chart_analysis['data_type'] == 'trends':
-                return self.create_trend_chart(question, chart_analysis)
-            
-            elif chart_analysis['data_type'] == 'parts':
-                return self.create_parts_analysis_chart(question, chart_analysis)
-            
-            elif chart_analysis['data_type'] == 'defects':
-                return self.create_defect_analysis_chart(question, chart_analysis)
-            
-            elif chart_analysis['data_type'] == 'monthly':
-                return self.create_monthly_analysis_chart(question, chart_analysis)
-            
-            else:
-                # Intelligent fallback based on question content
-                return self.create_smart_fallback_chart(question)
+            # Intelligent fallback based on question content
+            return self.create_smart_fallback_chart(question, chart_analysis)
                 
         except Exception as e:
             return f"❌ **Error generating chart:** {str(e)}\n\nLet me try a simpler approach...\n\n" + self.create_basic_chart(question)
     
+    def render_chart_image(self, fig, width, height, image_format='png'):
+        """Render a figure to a base64 image, reusing the image for an identical figure"""
+        height = min(height, _MAX_CHART_HEIGHT)
+        key = (fig.to_json(), width, height, image_format)
+        img_base64 = self.chart_image_cache.get(key)
+        if img_base64 is None:
+            img_bytes = fig.to_image(format=image_format, width=width, height=height)
+            img_base64 = b64encode(img_bytes).decode('ascii')
+            self.chart_image_cache[key] = img_base64
+        return img_base64
+    
+    def render_chart(self, fig, width, height):
+        """Chart embed for a response, as a PNG or SVG data URI or a Plotly JSON block"""
+        if self.chart_render_mode == 'json':
+            return f"```plotly\n{fig.to_json()}\n```"
+        if self.chart_render_mode == 'svg':
+            return f"data:image/svg+xml;base64,{self.render_chart_image(fig, width, height, 'svg')}"
+        return f"data:image/png;base64,{self.render_chart_image(fig, width, height)}"
+    
     def create_rejection_reasons_chart(self, question):
         """Create a chart showing top rejection reasons"""
         try:
             # Extract number if specified (top 5, top 10, etc.)
-            import re
-            number_match = re.search(r'top\s*(\d+)', question.lower())
+            number_match = _TOP_N_RE.search(question.lower())
             count = int(number_match.group(1)) if number_match else 15
             
             # Get top rejection reasons data
-            defect_totals = {}
-            for col in self.defect_columns:
-                if col in self.df.columns:
-                    total = self.df[col].sum()
-                    if total > 0:
-                        defect_totals[col] = total
-            
-            if not defect_totals:
-                return "❌ **Error:** No defect data found for chart generation."
+            defect_totals = self._active_defect_totals
             
-            # Sort and get top N
-            sorted_defects = sorted(defect_totals.items(), key=lambda x: x[1], reverse=True)[:count]
+            if defect_totals.empty:
+                return "❌ **Error:** No defect data found for chart generation."
             
-            # Create chart data
-            defect_names = [item[0] for item in sorted_defects]
-            defect_counts = [item[1] for item in sorted_defects]
+            # Top N defects as chart data
+            top_defects = defect_totals.nlargest(count)
+            defect_names = top_defects.index.tolist()
+            defect_counts = top_defects.tolist()
             
             # Determine chart type from question
             chart_type = 'bar'  # default
@@ -578,48 +779,40 @@ class IntelligentDataAnalyzer:
                 chart_type = 'line'
             
             if chart_type == 'pie':
-                fig = px.pie(
-                    values=defect_counts[:10],  # Limit pie chart to top 10 for readability
-                    names=defect_names[:10],
-                    title=f'Top {min(10, len(defect_names))} Rejection Reasons Distribution'
-                )
-                fig.update_traces(textposition='inside', textinfo='percent+label')
-                fig.update_layout(
-                    showlegend=True,
-                    legend=dict(orientation="v", yanchor="top", y=1, xanchor="left", x=1.01)
+                fig = _pie_chart(
+                    defect_counts[:10],  # Limit pie chart to top 10 for readability
+                    defect_names[:10],
+                    f'Top {min(10, len(defect_names))} Rejection Reasons Distribution'
                 )
             else:
                 # Bar chart (default)
-                fig = px.bar(
-                    x=defect_counts,
-                    y=defect_names,
-                    orientation='h',
-                    title=f'Top {len(defect_names)} Rejection Causes',
-                    labels={'x': 'Total Rejections', 'y': 'Defect Type'}
-                )
-                fig.update_layout(
-                    height=max(400, len(defect_names) * 25),
-                    margin=dict(l=200, r=50, t=80, b=50),
-                    yaxis={'categoryorder': 'total ascending'}
+                fig = _bar_chart(
+                    defect_counts,
+                    defect_names,
+                    f'Top {len(defect_names)} Rejection Causes',
+                    'Total Rejections',
+                    'Defect Type',
+                    max(400, len(defect_names) * 25)
                 )
             
-            # Convert to base64 image
-            img_bytes = fig.to_image(format="png", width=1000, height=max(600, len(defect_names) * 25))
-            img_base64 = base64.b64encode(img_bytes).decode()
+            # Render the chart for the response
+            chart_embed = self.render_chart(fig, width=1000, height=max(600, len(defect_names) * 25))
             
             # Create response with chart and analysis
             total_rejections = sum(defect_counts)
             top_3_percent = sum(defect_counts[:3]) / total_rejections * 100
             
-            response = f"📊 **{chart_type.title()} Chart: Top {len(defect_names)} Rejection Reasons**\n\n"
-            response += f"🎯 **Quick Insights:**\n"
-            response += f"• Top defect: **{defect_names[0]}** ({defect_counts[0]:,} parts)\n"
-            response += f"• Top 3 defects account for {top_3_percent:.1f}% of all rejections\n"
-            response += f"• Total categories analyzed: {len(self.defect_columns)}\n\n"
-            response += f"📈 **Chart Image:**\n"
-            response += f"data:image/png;base64,{img_base64}"
+            response = [
+                f"📊 **{chart_type.title()} Chart: Top {len(defect_names)} Rejection Reasons**\n\n",
+                f"🎯 **Quick Insights:**\n",
+                f"• Top defect: **{defect_names[0]}** ({defect_counts[0]:,} parts)\n",
+                f"• Top 3 defects account for {top_3_percent:.1f}% of all rejections\n",
+                f"• Total categories analyzed: {len(self.defect_columns)}\n\n",
+                f"📈 **Chart Image:**\n",
+                chart_embed
+            ]
             
-            return response
+            return ''.join(response)
             
         except Exception as e:
             return f"❌ **Error creating rejection chart:** {str(e)}"
@@ -627,14 +820,9 @@ class IntelligentDataAnalyzer:
     def create_trend_chart(self, question):
         """Create a trend chart showing rejections over time"""
         try:
+            go = _plotly()
             # Group by month for trend analysis
-            monthly_data = self.df.groupby(self.df['Date'].dt.to_period('M')).agg({
-                'Total Rej Qty.': 'sum',
-                'Inspected Qty.': 'sum'
-            }).reset_index()
-            
-            monthly_data['Date'] = monthly_data['Date'].dt.to_timestamp()
-            monthly_data['Rejection_Rate'] = (monthly_data['Total Rej Qty.'] / monthly_data['Inspected Qty.']) * 100
+            monthly_data = self._monthly_trend
             
             # Create trend chart
             fig = go.Figure()
@@ -668,23 +856,24 @@ class IntelligentDataAnalyzer:
                 showlegend=True
             )
             
-            # Convert to base64
-            img_bytes = fig.to_image(format="png", width=1000, height=500)
-            img_base64 = base64.b64encode(img_bytes).decode()
+            # Render the chart for the response
+            chart_embed = self.render_chart(fig, width=1000, height=500)
             
             # Analysis
             trend_direction = "improving" if monthly_data['Total Rej Qty.'].iloc[-1] < monthly_data['Total Rej Qty.'].iloc[0] else "worsening"
             latest_rate = monthly_data['Rejection_Rate'].iloc[-1]
             
-            response = f"📈 **Trend Analysis Chart**\n\n"
-            response += f"🎯 **Key Insights:**\n"
-            response += f"• Trend direction: **{trend_direction}**\n"
-            response += f"• Latest rejection rate: **{latest_rate:.2f}%**\n"
-            response += f"• Data period: {len(monthly_data)} months\n\n"
-            response += f"📊 **Chart Image:**\n"
-            response += f"data:image/png;base64,{img_base64}"
+            response = [
+                f"📈 **Trend Analysis Chart**\n\n",
+                f"🎯 **Key Insights:**\n",
+                f"• Trend direction: **{trend_direction}**\n",
+                f"• Latest rejection rate: **{latest_rate:.2f}%**\n",
+                f"• Data period: {len(monthly_data)} months\n\n",
+                f"📊 **Chart Image:**\n",
+                chart_embed
+            ]
             
-            return response
+            return ''.join(response)
             
         except Exception as e:
             return f"❌ **Error creating trend chart:** {str(e)}"
@@ -702,45 +891,39 @@ class IntelligentDataAnalyzer:
             'specific_defect': None
         }
         
+        # Find every chart keyword once, then resolve the rules with set lookups
+        hits = {word for word in _CHART_KEYWORDS if word in question_lower}
+        
         # Determine chart type
-        if 'pie' in question_lower:
-            analysis['chart_type'] = 'pie'
-        elif 'line' in question_lower or 'trend' in question_lower:
-            analysis['chart_type'] = 'line'
-        elif 'bar' in question_lower:
-            analysis['chart_type'] = 'bar'
+        analysis['chart_type'] = next(
+            (chart_type for words, chart_type in _CHART_TYPE_RULES if not hits.isdisjoint(words)),
+            analysis['chart_type']
+        )
         
         # Determine data type
-        if any(word in question_lower for word in ['part', 'component']):
-            analysis['data_type'] = 'parts'
-        elif any(word in question_lower for word in ['trend', 'time', 'monthly', 'daily', 'over time']):
-            analysis['data_type'] = 'trends'
-        elif any(word in question_lower for word in ['defect', 'rejection', 'reason', 'cause']):
-            analysis['data_type'] = 'rejections'
-        elif 'monthly' in question_lower:
-            analysis['data_type'] = 'monthly'
+        analysis['data_type'] = next(
+            (data_type for words, data_type in _CHART_DATA_RULES if not hits.isdisjoint(words)),
+            analysis['data_type']
+        )
         
         # Extract count (top 5, top 10, etc.)
-        import re
-        number_match = re.search(r'top\s*(\d+)', question_lower)
+        number_match = _TOP_N_RE.search(question_lower)
         if number_match:
             analysis['count'] = int(number_match.group(1))
         
         # Extract time period
-        if any(month in question_lower for month in ['january', 'february', 'march', 'april', 'may', 'june', 'july', 'august', 'september', 'october', 'november', 'december']):
+        if not hits.isdisjoint(_MONTH_NUMBERS):
             analysis['time_period'] = 'monthly'
         
         # Extract specific part
-        part_match = re.search(r'part\s+([A-Z][A-Z\s\d-]+)', question_lower)
+        part_match = _CHART_PART_RE.search(question_lower)
         if part_match:
             analysis['specific_part'] = part_match.group(1)
         
         # Extract specific defect
-        defect_keywords = ['burr', 'damage', 'toolmark', 'oversize', 'undersize', 'drilling', 'milling']
-        for keyword in defect_keywords:
-            if keyword in question_lower:
-                analysis['specific_defect'] = keyword
-                break
+        analysis['specific_defect'] = next(
+            (keyword for keyword in _CHART_DEFECT_KEYWORDS if keyword in hits), None
+        )
         
         return analysis
     
@@ -754,68 +937,53 @@ class IntelligentDataAnalyzer:
             chart_type = chart_analysis.get('chart_type', 'bar')
             
             # Get top rejection reasons data
-            defect_totals = {}
-            for col in self.defect_columns:
-                if col in self.df.columns:
-                    total = self.df[col].sum()
-                    if total > 0:
-                        defect_totals[col] = total
-            
-            if not defect_totals:
-                return "❌ **Error:** No defect data found for chart generation."
+            defect_totals = self._active_defect_totals
             
-            # Sort and get top N
-            sorted_defects = sorted(defect_totals.items(), key=lambda x: x[1], reverse=True)[:count]
+            if defect_totals.empty:
+                return "❌ **Error:** No defect data found for chart generation."
             
-            # Create chart data
-            defect_names = [item[0] for item in sorted_defects]
-            defect_counts = [item[1] for item in sorted_defects]
+            # Top N defects as chart data
+            top_defects = defect_totals.nlargest(count)
+            defect_names = top_defects.index.tolist()
+            defect_counts = top_defects.tolist()
             
             if chart_type == 'pie':
                 # Limit pie chart to top 10 for readability
                 display_count = min(10, len(defect_names))
-                fig = px.pie(
-                    values=defect_counts[:display_count],
-                    names=defect_names[:display_count],
-                    title=f'Top {display_count} Rejection Reasons Distribution'
-                )
-                fig.update_traces(textposition='inside', textinfo='percent+label')
-                fig.update_layout(
-                    showlegend=True,
-                    legend=dict(orientation="v", yanchor="top", y=1, xanchor="left", x=1.01)
+                fig = _pie_chart(
+                    defect_counts[:display_count],
+                    defect_names[:display_count],
+                    f'Top {display_count} Rejection Reasons Distribution'
                 )
             else:
                 # Bar chart (default)
-                fig = px.bar(
-                    x=defect_counts,
-                    y=defect_names,
-                    orientation='h',
-                    title=f'Top {len(defect_names)} Rejection Causes',
-                    labels={'x': 'Total Rejections', 'y': 'Defect Type'}
-                )
-                fig.update_layout(
-                    height=max(400, len(defect_names) * 25),
-                    margin=dict(l=200, r=50, t=80, b=50),
-                    yaxis={'categoryorder': 'total ascending'}
+                fig = _bar_chart(
+                    defect_counts,
+                    defect_names,
+                    f'Top {len(defect_names)} Rejection Causes',
+                    'Total Rejections',
+                    'Defect Type',
+                    max(400, len(defect_names) * 25)
                 )
             
-            # Convert to base64 image
-            img_bytes = fig.to_image(format="png", width=1000, height=max(600, len(defect_names) * 25))
-            img_base64 = base64.b64encode(img_bytes).decode()
+            # Render the chart for the response
+            chart_embed = self.render_chart(fig, width=1000, height=max(600, len(defect_names) * 25))
             
             # Create response with chart and analysis
             total_rejections = sum(defect_counts)
             top_3_percent = sum(defect_counts[:3]) / total_rejections * 100 if len(defect_counts) >= 3 else 100
             
-            response = f"📊 **{chart_type.title()} Chart: Top {len(defect_names)} Rejection Reasons**\n\n"
-            response += f"🎯 **Quick Insights:**\n"
-            response += f"• Top defect: **{defect_names[0]}** ({defect_counts[0]:,} parts)\n"
-            response += f"• Top 3 defects account for {top_3_percent:.1f}% of all rejections\n"
-            response += f"• Total categories analyzed: {len(self.defect_columns)}\n\n"
-            response += f"📈 **Chart Image:**\n"
-            response += f"data:image/png;base64,{img_base64}"
+            response = [
+                f"📊 **{chart_type.title()} Chart: Top {len(defect_names)} Rejection Reasons**\n\n",
+                f"🎯 **Quick Insights:**\n",
+                f"• Top defect: **{defect_names[0]}** ({defect_counts[0]:,} parts)\n",
+                f"• Top 3 defects account for {top_3_percent:.1f}% of all rejections\n",
+                f"• Total categories analyzed: {len(self.defect_columns)}\n\n",
+                f"📈 **Chart Image:**\n",
+                chart_embed
+            ]
             
-            return response
+            return ''.join(response)
             
         except Exception as e:
             return f"❌ **Error creating rejection chart:** {str(e)}"
@@ -823,14 +991,9 @@ class IntelligentDataAnalyzer:
     def create_trend_chart(self, question, chart_analysis=None):
         """Create a trend chart showing rejections over time"""
         try:
+            go = _plotly()
             # Group by month for trend analysis
-            monthly_data = self.df.groupby(self.df['Date'].dt.to_period('M')).agg({
-                'Total Rej Qty.': 'sum',
-                'Inspected Qty.': 'sum'
-            }).reset_index()
-            
-            monthly_data['Date'] = monthly_data['Date'].dt.to_timestamp()
-            monthly_data['Rejection_Rate'] = (monthly_data['Total Rej Qty.'] / monthly_data['Inspected Qty.']) * 100
+            monthly_data = self._monthly_trend
             
             # Create trend chart
             fig = go.Figure()
@@ -864,23 +1027,24 @@ class IntelligentDataAnalyzer:
                 showlegend=True
             )
             
-            # Convert to base64
-            img_bytes = fig.to_image(format="png", width=1000, height=500)
-            img_base64 = base64.b64encode(img_bytes).decode()
+            # Render the chart for the response
+            chart_embed = self.render_chart(fig, width=1000, height=500)
             
             # Analysis
             trend_direction = "improving" if monthly_data['Total Rej Qty.'].iloc[-1] < monthly_data['Total Rej Qty.'].iloc[0] else "worsening"
             latest_rate = monthly_data['Rejection_Rate'].iloc[-1]
             
-            response = f"📈 **Trend Analysis Chart**\n\n"
-            response += f"🎯 **Key Insights:**\n"
-            response += f"• Trend direction: **{trend_direction}**\n"
-            response += f"• Latest rejection rate: **{latest_rate:.2f}%**\n"
-            response += f"• Data period: {len(monthly_data)} months\n\n"
-            response += f"📊 **Chart Image:**\n"
-            response += f"data:image/png;base64,{img_base64}"
+            response = [
+                f"📈 **Trend Analysis Chart**\n\n",
+                f"🎯 **Key Insights:**\n",
+                f"• Trend direction: **{trend_direction}**\n",
+                f"• Latest rejection rate: **{latest_rate:.2f}%**\n",
+                f"• Data period: {len(monthly_data)} months\n\n",
+                f"📊 **Chart Image:**\n",
+                chart_embed
+            ]
             
-            return response
+            return ''.join(response)
             
         except Exception as e:
             return f"❌ **Error creating trend chart:** {str(e)}"
@@ -894,40 +1058,36 @@ class IntelligentDataAnalyzer:
             count = chart_analysis.get('count', 15)
             
             # Get top parts with highest rejections
-            parts_data = self.df.groupby('Part Name')['Total Rej Qty.'].sum().sort_values(ascending=False)[:count]
+            parts_data = self._part_rej_sum.nlargest(count)
             
             # Create horizontal bar chart for better readability
-            fig = px.bar(
-                x=parts_data.values,
-                y=parts_data.index,
-                orientation='h',
-                title=f'Top {count} Parts by Rejection Count',
-                labels={'x': 'Total Rejections', 'y': 'Part Name'}
-            )
-            
-            fig.update_layout(
-                height=max(400, count * 30),
-                margin=dict(l=200, r=50, t=80, b=50),
-                yaxis={'categoryorder': 'total ascending'}
+            fig = _bar_chart(
+                parts_data.tolist(),
+                parts_data.index.tolist(),
+                f'Top {count} Parts by Rejection Count',
+                'Total Rejections',
+                'Part Name',
+                max(400, count * 30)
             )
             
-            # Convert to base64
-            img_bytes = fig.to_image(format="png", width=1000, height=max(400, count * 30))
-            img_base64 = base64.b64encode(img_bytes).decode()
+            # Render the chart for the response
+            chart_embed = self.render_chart(fig, width=1000, height=max(400, count * 30))
             
             # Analysis
-            total_parts = self.df['Part Name'].nunique()
+            total_parts = self.metadata['unique_parts']
             top_part_rejections = parts_data.iloc[0]
             
-            response = f"🔧 **Parts Analysis Chart**\n\n"
-            response += f"🎯 **Key Insights:**\n"
-            response += f"• Worst performing part: **{parts_data.index[0]}** ({top_part_rejections:,} rejections)\n"
-            response += f"• Total unique parts: {total_parts}\n"
-            response += f"• Showing top {count} parts by rejection count\n\n"
-            response += f"📊 **Chart Image:**\n"
-            response += f"data:image/png;base64,{img_base64}"
+            response = [
+                f"🔧 **Parts Analysis Chart**\n\n",
+                f"🎯 **Key Insights:**\n",
+                f"• Worst performing part: **{parts_data.index[0]}** ({top_part_rejections:,} rejections)\n",
+                f"• Total unique parts: {total_parts}\n",
+                f"• Showing top {count} parts by rejection count\n\n",
+                f"📊 **Chart Image:**\n",
+                chart_embed
+            ]
             
-            return response
+            return ''.join(response)
             
         except Exception as e:
             return f"❌ **Error creating parts chart:** {str(e)}"
@@ -940,66 +1100,66 @@ class IntelligentDataAnalyzer:
         """Create monthly analysis chart"""
         return self.create_trend_chart(question, chart_analysis)
     
-    def create_smart_fallback_chart(self, question):
+    def create_smart_fallback_chart(self, question, chart_analysis=None):
         """Smart fallback when specific chart type can't be determined"""
         # Analyze the question content to make best guess
         question_lower = question.lower()
+        if chart_analysis is None:
+            chart_analysis = self.analyze_chart_request(question)
         
         if any(word in question_lower for word in ['part', 'component']):
-            return self.create_parts_analysis_chart(question)
+            return self.create_parts_analysis_chart(question, chart_analysis)
         elif any(word in question_lower for word in ['time', 'trend', 'monthly']):
-            return self.create_trend_chart(question)
+            return self.create_trend_chart(question, chart_analysis)
         else:
             # Default to rejection reasons
-            return self.create_rejection_reasons_chart(question)
+            return self.create_rejection_reasons_chart(question, chart_analysis)
     
     def create_basic_chart(self, question):
         """Basic chart creation as final fallback"""
         try:
             # Simple bar chart of top 10 rejection reasons
-            defect_totals = {}
-            for col in self.defect_columns:
-                if col in self.df.columns:
-                    total = self.df[col].sum()
-                    if total > 0:
-                        defect_totals[col] = total
-            
-            if not defect_totals:
-                return "❌ **Error:** No defect data available for chart creation."
+            defect_totals = self._active_defect_totals
             
-            sorted_defects = sorted(defect_totals.items(), key=lambda x: x[1], reverse=True)[:10]
-            defect_names = [item[0] for item in sorted_defects]
-            defect_counts = [item[1] for item in sorted_defects]
-            
-            fig = px.bar(
-                x=defect_counts,
-                y=defect_names,
-                orientation='h',
-                title='Top 10 Rejection Causes (Basic Chart)',
-                labels={'x': 'Total Rejections', 'y': 'Defect Type'}
-            )
+            if defect_totals.empty:
+                return "❌ **Error:** No defect data available for chart creation."
             
-            fig.update_layout(
-                height=500,
-                margin=dict(l=200, r=50, t=80, b=50),
-                yaxis={'categoryorder': 'total ascending'}
+            top_defects = defect_totals.nlargest(10)
+            defect_names = top_defects.index.tolist()
+            defect_counts = top_defects.tolist()
+            
+            fig = _bar_chart(
+                defect_counts,
+                defect_names,
+                'Top 10 Rejection Causes (Basic Chart)',
+                'Total Rejections',
+                'Defect Type',
+                500
             )
             
-            img_bytes = fig.to_image(format="png", width=800, height=500)
-            img_base64 = base64.b64encode(img_bytes).decode()
+            chart_embed = self.render_chart(fig, width=800, height=500)
             
-            response = f"📊 **Basic Chart: Top 10 Rejection Causes**\n\n"
-            response += f"🎯 **Top Defect:** {defect_names[0]} ({defect_counts[0]:,} parts)\n\n"
-            response += f"📈 **Chart Image:**\n"
-            response += f"data:image/png;base64,{img_base64}"
+            response = [
+                f"📊 **Basic Chart: Top 10 Rejection Causes**\n\n",
+                f"🎯 **Top Defect:** {defect_names[0]} ({defect_counts[0]:,} parts)\n\n",
+                f"📈 **Chart Image:**\n",
+                chart_embed
+            ]
             
-            return response
+            return ''.join(response)
             
         except Exception as e:
             return f"❌ **Error creating basic chart:** {str(e)}"
     
     def handle_general_questions(self, question):
         """Handle general questions about the dataset"""
+        # The summary only reads load-time metadata, so render it once
+        if self._general_answer is None:
+            self._general_answer = self.format_general_answer()
+        return self._general_answer
+    
+    def format_general_answer(self):
+        """Data summary and suggested topics built from the metadata"""
         return f"""
 📋 **Data Summary:**
 • Total records: {self.metadata['total_records']}
